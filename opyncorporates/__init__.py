@@ -7,7 +7,7 @@ from opyncorporates.api import (
 from opyncorporates.engines import engines
 
 
-def create_engine(api_version="0.4", api_token=None):
+def create_engine(api_version="0.4", api_token=None, **kwargs):
     """ Factory function to create a Version object.
 
     The factory function allows a user to select the API version to use
@@ -19,9 +19,49 @@ def create_engine(api_version="0.4", api_token=None):
         The API token used for the request.
     api_version: str (optional)
         The API version used for the request.
+    max_workers: int (optional)
+        The maximum number of concurrent requests submitted by the engine's
+        bulk methods (e.g. fetch_many and crawl). The default is 8.
+    api_tokens: list (optional)
+        A pool of API tokens. Requests are spread across the tokens by
+        remaining quota, and a token is taken out of rotation when it is
+        throttled or exhausted.
+    rate_limit: float (optional)
+        The maximum number of calls per second for each API token.
+    timeout: tuple (optional)
+        The (connect, read) timeouts in seconds for each request. The
+        default is (5, 30).
+    hedge: bool or Hedger (optional)
+        Whether to hedge requests: if a request is slower than a running
+        latency percentile, a duplicate request is submitted and the first
+        response is used. Pass a Hedger object to configure the percentile
+        and the budget for duplicate requests.
+    store: str or EntityStore (optional)
+        A local entity store, or the path of its SQLite database. Fetches
+        are answered from the store when it holds a fresh copy of the
+        requested entity, and fetched entities are written to the store.
+    dump: str or DumpIndex (optional)
+        An indexed bulk data file of companies, or the path of the file.
+        Fetches of companies in the dump are answered from the dump, and
+        the API is called only for companies added since it was taken. A
+        path is opened with the time of the dump kept in its index, so an
+        index built with the dumped_at of the dump is required.
+    coalesce: bool (optional)
+        Whether identical requests submitted at the same time by several
+        threads share a single call to the API. The default is True.
+    scheduler: bool or Scheduler (optional)
+        Whether to schedule requests by priority class, so that interactive
+        requests are not starved by bulk jobs. Pass a Scheduler object to
+        configure the concurrency caps of each class.
+    refresh: float or Refresher (optional)
+        A soft TTL in seconds for the entities in the engine's store. Once
+        the stored copy of a frequently read entity is older than the soft
+        TTL, it is still served at once and is refetched in the background.
+        Pass a Refresher object to configure the number of reads that make
+        an entity hot and the share of the rate limit used for refreshes.
 
     """
 
     api_version = str(api_version).replace('v', '')
 
-    return engines[api_version](api_token=api_token)
+    return engines[api_version](api_token=api_token, **kwargs)
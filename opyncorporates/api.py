@@ -1,11 +1,53 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 import re
+import threading
 
 import requests
 
+from opyncorporates.buffers import DEFAULT_MEMORY_LIMIT, SpillBuffer
+from opyncorporates.columns import ColumnBuilder
+from opyncorporates.paginate import Paginator
+from opyncorporates.scheduling import bind, default_priority
+
 BASE_URL = 'https://api.opencorporates.com'
 
+# default (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+
+def build_response(status_code=200, data=None, headers=None, text=None,
+                   url=None):
+    """ Returns a requests Response that was not received from the API.
+
+    Parameters
+    ----------
+    status_code: int (optional)
+        The status code of the response. Defaults to 200.
+    data: obj (optional)
+        The JSON body of the response. Defaults to an empty object.
+    headers: dict (optional)
+        The headers of the response.
+    text: str (optional)
+        A body used instead of data, e.g. an error message.
+    url: str (optional)
+        The url of the response.
+
+    """
+
+    response = requests.models.Response()
+    response.status_code = status_code
+    response.url = url
+    response.encoding = 'utf-8'
+    if text is None:
+        response.headers['Content-Type'] = 'application/json'
+        text = json.dumps({} if data is None else data)
+    response.headers.update(headers or {})
+    response._content = text.encode('utf-8')
+    return response
+
 
 class Request(object):
     """ An object for consuming the opencorporates API.
@@ -47,6 +89,9 @@ class Request(object):
             The API version used for the request.
         api_token: str
             The API token used for the request.
+        engine: obj (optional)
+            The engine used to submit the request. When no engine is
+            provided, the request is submitted with ``requests.get``.
         object_type: str
             The type of object associated with the request.
         url: str
@@ -58,6 +103,7 @@ class Request(object):
 
     def __init__(self, *args, **kwargs):
 
+        self._engine = kwargs.pop('engine', None)
         self.args = list(args)
         self.vars = kwargs
         self.api_token = kwargs.get('api_token', None)
@@ -105,11 +151,46 @@ class Request(object):
             A requests.Models.Response object with a requested_at attribute.
 
         """
-        response = requests.get(self.url)
+        response = self.send(self.url)
         response.requested_at = datetime.utcnow()
         self.responses.append(response)
         return response
 
+    def paginate(self, max_workers=None, unwrap=True):
+        """ Returns an iterator over every item of a paginated collection.
+
+        The request's response is used as the first page, and the remaining
+        pages are requested concurrently through the request's engine. See
+        opyncorporates.paginate.Paginator for details.
+
+        Examples
+        --------
+        request = engine.request('v0.4', 'companies', 'gb', '00102498',
+                                 'filings')
+        filings = list(request.paginate())
+
+        """
+
+        return Paginator(self, max_workers=max_workers, unwrap=unwrap)
+
+    @property
+    def engine(self):
+        """ The engine used to submit the request, or None."""
+
+        return self._engine
+
+    def send(self, url):
+        """ Submits a GET request for url through the request's engine.
+
+        Used for the request itself and for further requests related to it,
+        such as other pages of its results.
+
+        """
+
+        if self._engine is not None:
+            return self._engine.send(url)
+        return requests.get(url, timeout=DEFAULT_TIMEOUT)
+
     def __build(self, api_version, *args, **kwargs):
         """ Build the Request object using args and kwargs provided."""
 
@@ -268,13 +349,12 @@ class MatchRequest(Request):
         The results of the match request.
     """
 
-    def __init__(self, cls, api_version, object_type, *args, **kwargs):
+    def __init__(self, api_version, object_type, *args, **kwargs):
 
         q = kwargs.pop('q', None)
         if q is None:
             raise ValueError('Enter a term for your match request.')
 
-        self._cls = cls
         self.object_type = object_type
         self.match_term = q
         self.q = q.lower().replace(' ', '+')
@@ -362,6 +442,7 @@ class SearchRequest(Request):
         self.total_pages = None
         self.total_count = None
         self.page_urls = []
+        self._results = None
 
         api_version = str(api_version).replace('v', '')
 
@@ -385,19 +466,22 @@ class SearchRequest(Request):
 
     @property
     def results(self):
-        """ Yields all search results.
+        """ Returns a lazy sequence view of all search results.
 
-        Yields
-        ------
-        item: dict
-            A dictionary representing a search result item.
+        The view supports iteration, len(), indexing and slicing, and
+        requests only the pages that hold the selected items. See
+        SearchResults for details.
+
+        Returns
+        -------
+        results: obj
+            A SearchResults object.
 
         """
-        for p in self.page_urls:
-            page = self.get_page(p)
-            for item in page:
-                yield item
-        return
+
+        if self._results is None:
+            self._results = SearchResults(self)
+        return self._results
 
     def get_page(self, page):
         """ Calls the opencorporates API and returns a page of results.
@@ -416,11 +500,222 @@ class SearchRequest(Request):
 
         url = self.url + '&page=%s' % page
 
-        response = requests.get(url)
+        response = self.send(url)
         if response.status_code == 200:
-            res = json.loads(response.text)['results'][self.object_type]
-            items = []
-            for item in res:
-                for k,v in item.items():
-                    items.append(v)
+            return self._page_items(response)
+
+    def _page_items(self, response):
+        """ Returns the result items in a page response."""
+
+        res = json.loads(response.text)['results'][self.object_type]
+        items = []
+        for item in res:
+            for k, v in item.items():
+                items.append(v)
+        return items
+
+
+class SearchResults(object):
+    """ A lazy, random-access sequence view of a search's results.
+
+    Items are loaded a page at a time. Indexing and slicing request only
+    the pages that hold the selected items, and the most recently used
+    pages are kept in a bounded LRU cache. When pages are read in order,
+    the following pages are requested in the background before they are
+    needed.
+
+    Examples
+    --------
+    results = engine.search('companies', q='bank').results
+    len(results)        # total_count, without requesting any more pages
+    results[12345]      # requests a single page
+    results[100:200]    # requests the pages holding items 100 to 199
+
+    Parameters
+    ----------
+    search: obj
+        The SearchRequest whose results are viewed.
+    max_pages: int (optional)
+        The maximum number of pages kept in memory. Defaults to 16.
+    prefetch: int (optional)
+        The number of pages requested ahead of sequential reads. Defaults
+        to 2.
+
+    """
+
+    def __init__(self, search, max_pages=16, prefetch=2):
+
+        self.search = search
+        self.max_pages = max(max_pages, prefetch + 1)
+        self.prefetch = prefetch
+
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._last_page = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+        # the search's own response holds the first page
+        if search.total_count and search.response.status_code == 200:
+            self._pages[1] = search._page_items(search.response)
+
+    def __len__(self):
+        return self.search.total_count or 0
+
+    def __iter__(self):
+        for page in range(1, (self.search.total_pages or 0) + 1):
+            # a full scan runs at bulk priority unless the caller chose one
+            with default_priority('bulk'):
+                items = self.page(page)
+            for item in items:
+                yield item
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            per_page = self.search.per_page
+            pages = sorted(set(i // per_page + 1 for i in indices))
+            loaded = {}
+            for n, page in enumerate(pages):
+                # keep the next pages of the slice in flight
+                self._prefetch(pages[n + 1:n + 1 + self.prefetch])
+                loaded[page] = self.page(page)
+            return [loaded[i // per_page + 1][i % per_page] for i in indices]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('search result index out of range')
+        return self._item(index)
+
+    def collect(self, memory_limit=DEFAULT_MEMORY_LIMIT, dir=None):
+        """ Collects every result into a SpillBuffer.
+
+        The results are requested once, and can then be iterated and
+        indexed any number of times while holding at most memory_limit
+        bytes of results in memory.
+
+        Parameters
+        ----------
+        memory_limit: int (optional)
+            The number of bytes of results kept in memory before results
+            are spilled to a temporary file. Defaults to 64MB.
+        dir: str (optional)
+            The directory of the temporary file.
+
+        Returns
+        -------
+        buffer: obj
+            A SpillBuffer object holding every result.
+
+        """
+
+        return SpillBuffer(memory_limit=memory_limit, dir=dir).extend(self)
+
+    def batches(self, size=None, fields=None, format='list'):
+        """ Yields the results as column-oriented batches.
+
+        Each batch is an ordered dict mapping column names to the values of
+        up to size results, and is built directly from the items of each
+        page, e.g. for pandas.DataFrame(batch).
+
+        Examples
+        --------
+        results = engine.search('companies', q='bank').results
+        for batch in results.batches(1000, fields={
+                'number': 'company_number',
+                'country': 'registered_address.country'}):
+            ...
+
+        Parameters
+        ----------
+        size: int (optional)
+            The number of results in each batch, except the last. Defaults
+            to the number of results per page.
+        fields: list or dict (optional)
+            The fields to include as columns, as dotted paths into each
+            result. See opyncorporates.columns.parse_fields. Defaults to
+            the keys of the first result.
+        format: str (optional)
+            'list' for lists, 'array' for typed arrays, or 'numpy' for NumPy
+            arrays. Defaults to 'list'.
+
+        """
+
+        size = size or self.search.per_page
+        builder = ColumnBuilder(fields, format=format)
+        for page in range(1, (self.search.total_pages or 0) + 1):
+            with default_priority('bulk'):
+                items = self.page(page)
+            start = 0
+            while start < len(items):
+                end = start + size - len(builder)
+                builder.extend(items[start:end])
+                start = end
+                if len(builder) >= size:
+                    yield builder.build()
+        if len(builder):
+            yield builder.build()
+
+    def page(self, page):
+        """ Returns the items on a page (numbered from 1) of the results."""
+
+        with self._lock:
+            if page in self._pages:
+                self._pages[page] = self._pages.pop(page)
+                items = self._pages[page]
+            else:
+                items = None
+            future = self._pending.get(page)
+            sequential = self._last_page is not None and \
+                page == self._last_page + 1
+            self._last_page = page
+
+        if sequential:
+            self._prefetch(range(page + 1, page + self.prefetch + 1))
+
+        if items is not None:
             return items
+        if future is not None:
+            return future.result()
+        return self._fetch(page)
+
+    def _item(self, index):
+        per_page = self.search.per_page
+        items = self.page(index // per_page + 1)
+        return items[index % per_page]
+
+    def _fetch(self, page):
+        """ Requests a page and adds it to the LRU cache."""
+
+        try:
+            items = self.search.get_page(page)
+        finally:
+            with self._lock:
+                self._pending.pop(page, None)
+
+        if items is None:
+            msg = 'Failed to get page %s of the search results.' % page
+            raise RuntimeError(msg)
+
+        with self._lock:
+            self._pages[page] = items
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return items
+
+    def _prefetch(self, pages):
+        """ Requests pages in the background."""
+
+        total_pages = self.search.total_pages or 0
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max(
+                    self.prefetch, 1))
+            for page in pages:
+                if page > total_pages or page in self._pages \
+                        or page in self._pending:
+                    continue
+                self._pending[page] = self._pool.submit(
+                    bind(self._fetch, default='bulk'), page)
@@ -0,0 +1,166 @@
+from array import array
+import json
+import mmap
+import tempfile
+import threading
+
+"""Result buffers that spill to disk.
+
+A :class:`SpillBuffer` collects result items in memory until their encoded
+size reaches a memory limit, and appends any further items to a temporary
+file. The offset of each spilled item is kept in a compact index, and the
+file is read back through a memory map, so a buffer can be iterated any
+number of times and indexed at random without refetching its items.
+
+"""
+
+# the default memory limit in bytes
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+
+# the typecode of spilled item offsets: 'Q' is not available before
+# Python 3.3, where 'L' is 64 bits on most 64-bit platforms
+try:
+    OFFSET_TYPECODE = array('Q').typecode
+except ValueError:  # pragma: no cover
+    OFFSET_TYPECODE = 'L'
+
+
+class SpillBuffer(object):
+    """ An append-only sequence of items that spills to disk.
+
+    Items must be JSON serializable, such as the dicts returned by search
+    and fetch requests. The temporary file is deleted when the buffer is
+    closed or garbage collected.
+
+    Examples
+    --------
+    with SpillBuffer(memory_limit=16 * 1024 * 1024) as buffer:
+        buffer.extend(search.results)
+        names = sorted(item['name'] for item in buffer)
+        first = buffer[0]
+
+    Parameters
+    ----------
+    memory_limit: int (optional)
+        The number of bytes of encoded items kept in memory before items
+        are spilled to disk. Defaults to 64MB.
+    dir: str (optional)
+        The directory of the temporary file. Defaults to the system's
+        temporary directory.
+
+    Attributes
+    ----------
+    memory_size: int
+        The encoded size in bytes of the items held in memory.
+    spilled: int
+        The number of items spilled to disk.
+
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, dir=None):
+
+        self.memory_limit = memory_limit
+        self.dir = dir
+        self.memory_size = 0
+
+        self._items = []
+        self._offsets = array(OFFSET_TYPECODE)
+        self._file = None
+        self._size = 0
+        self._mapped = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # pragma: no cover
+            # the interpreter may be shutting down
+            pass
+
+    def __len__(self):
+        return len(self._items) + self.spilled
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('buffer index out of range')
+        if index < len(self._items):
+            return self._items[index]
+
+        index -= len(self._items)
+        with self._lock:
+            start = self._offsets[index]
+            end = self._offsets[index + 1] if index + 1 < self.spilled \
+                else self._size
+            mapped = self._map()
+            return json.loads(mapped[start:end].decode('utf-8'))
+
+    @property
+    def spilled(self):
+        return len(self._offsets)
+
+    def append(self, item):
+        """ Adds an item to the end of the buffer."""
+
+        encoded = json.dumps(item).encode('utf-8')
+        with self._lock:
+            if not self.spilled and \
+                    self.memory_size + len(encoded) <= self.memory_limit:
+                self._items.append(item)
+                self.memory_size += len(encoded)
+                return
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(dir=self.dir)
+            self._file.seek(self._size)
+            self._file.write(encoded)
+            self._offsets.append(self._size)
+            self._size += len(encoded)
+
+    def extend(self, items):
+        """ Adds each item in items to the end of the buffer."""
+
+        for item in items:
+            self.append(item)
+        return self
+
+    def close(self):
+        """ Releases the buffer's items and deletes its temporary file."""
+
+        with self._lock:
+            if self._mapped is not None:
+                self._mapped.close()
+            if self._file is not None:
+                self._file.close()
+            self._items = []
+            self._offsets = array(OFFSET_TYPECODE)
+            self._file = None
+            self._size = 0
+            self._mapped = None
+            self.memory_size = 0
+
+    def _map(self):
+        """ Returns a memory map covering every spilled item."""
+
+        mapped = self._mapped
+        if mapped is None or len(mapped) < self._size:
+            if mapped is not None:
+                mapped.close()
+            self._file.flush()
+            mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = mapped
+        return mapped
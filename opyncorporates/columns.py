@@ -0,0 +1,177 @@
+from array import array
+from collections import OrderedDict, namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""Column-oriented batches of results.
+
+A :class:`ColumnBuilder` turns result items into columns: an ordered dict
+mapping each column name to the values of one field. Fields are declared
+as dotted paths into the items, so that nested values are flattened into
+their own columns, e.g. 'registered_address.country' or
+'previous_names.0.company_name'.
+
+Columns are built as lists, as typed :mod:`array` arrays, or as NumPy
+arrays if NumPy is installed.
+
+"""
+
+FORMATS = ('list', 'array', 'numpy')
+
+# the typecode of int columns: 'q' is not available before Python 3.3,
+# where 'l' is 64 bits on most 64-bit platforms
+try:
+    INT_TYPECODE = array('q').typecode
+except ValueError:  # pragma: no cover
+    INT_TYPECODE = 'l'
+
+# array typecodes for typed fields
+TYPECODES = {int: INT_TYPECODE, float: 'd', bool: 'b'}
+
+Field = namedtuple('Field', ['name', 'path', 'type'])
+
+
+def parse_fields(fields):
+    """ Returns a list of Field tuples from a field declaration.
+
+    Parameters
+    ----------
+    fields: list or dict
+        Either a list of dotted paths, which are also the column names, or
+        a dict mapping column names to a path or a (path, type) tuple,
+        where type is int, float, bool or str.
+
+    Examples
+    --------
+    parse_fields(['name', 'registered_address.country'])
+    parse_fields({'name': 'name', 'employees': ('employees', int)})
+
+    """
+
+    if isinstance(fields, dict):
+        items = fields.items()
+    else:
+        items = [(path, path) for path in fields]
+
+    parsed = []
+    for name, path in items:
+        field_type = None
+        if isinstance(path, (list, tuple)):
+            path, field_type = path
+        parsed.append(Field(name, tuple(_segments(path)), field_type))
+    return parsed
+
+
+def _segments(path):
+    for segment in path.split('.'):
+        yield int(segment) if segment.isdigit() else segment
+
+
+def lookup(item, path):
+    """ Returns the value at path in item, or None if it is missing."""
+
+    for segment in path:
+        try:
+            item = item[segment]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return item
+
+
+class ColumnBuilder(object):
+    """ Accumulates result items as columns.
+
+    Examples
+    --------
+    builder = ColumnBuilder(['name', 'registered_address.country'])
+    builder.extend(items)
+    columns = builder.build()
+    columns['registered_address.country']
+
+    Parameters
+    ----------
+    fields: list or dict (optional)
+        The fields to collect, as accepted by parse_fields. Defaults to the
+        keys of the first item added.
+    format: str (optional)
+        The type of the columns: 'list' for lists, 'array' for typed arrays
+        or 'numpy' for NumPy arrays. Defaults to 'list'.
+
+        Typed columns are built for fields declared with int, float or bool
+        types, and lists (or NumPy object arrays) for other fields. Missing
+        values are NaN in float columns. Int and bool columns with missing
+        values are returned as lists, or as float arrays with NaN values
+        when using NumPy.
+
+    """
+
+    def __init__(self, fields=None, format='list'):
+
+        if format not in FORMATS:
+            raise ValueError('`%s` is not a column format.' % format)
+        if format == 'numpy' and numpy is None:
+            raise ImportError('The numpy format requires NumPy.')
+
+        self.fields = parse_fields(fields) if fields is not None else None
+        self.format = format
+        self._values = None
+
+    def __len__(self):
+        if not self._values:
+            return 0
+        return len(self._values[0])
+
+    def extend(self, items):
+        """ Adds the values of each item in items to the columns."""
+
+        if self.fields is None:
+            if not items:
+                return self
+            self.fields = parse_fields(list(items[0]))
+        if self._values is None:
+            self._values = [[] for _ in self.fields]
+
+        # extract a column at a time rather than a record at a time
+        for field, values in zip(self.fields, self._values):
+            path = field.path
+            if len(path) == 1:
+                key = path[0]
+                values.extend(item.get(key) for item in items)
+            else:
+                values.extend(lookup(item, path) for item in items)
+        return self
+
+    def build(self):
+        """ Returns the columns as an ordered dict, and starts a new batch."""
+
+        columns = OrderedDict()
+        for field, values in zip(self.fields or [], self._values or []):
+            columns[field.name] = self._column(field, values)
+        self._values = None
+        return columns
+
+    def _column(self, field, values):
+        typecode = TYPECODES.get(field.type)
+        missing = typecode is not None and None in values
+
+        if self.format == 'numpy':
+            if typecode is None:
+                column = numpy.empty(len(values), dtype=object)
+                column[:] = values
+                return column
+            if missing:
+                return numpy.array([numpy.nan if v is None else v
+                                    for v in values], dtype=float)
+            return numpy.array(values, dtype=field.type)
+
+        if self.format == 'array' and typecode is not None:
+            # convert values such as '10' as the NumPy format does
+            if typecode == 'd':
+                return array('d', (float('nan') if v is None else float(v)
+                                   for v in values))
+            if not missing:
+                return array(typecode, (field.type(v) for v in values))
+        return values
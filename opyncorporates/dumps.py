@@ -0,0 +1,291 @@
+from concurrent.futures import ProcessPoolExecutor
+import codecs
+import csv
+import io
+import json
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+
+from opyncorporates.graph import node_key
+
+"""Random-access lookups over OpenCorporates bulk data files.
+
+A :class:`DumpIndex` indexes a CSV or JSON lines bulk data file of companies
+by route key (e.g. ``companies/gb/00102498``) without loading the file into
+memory. The file is memory-mapped and split into chunks at line boundaries,
+and the chunks are parsed in parallel worker processes, each of which
+returns only the key, offset and length of every record. The offsets are
+kept in a SQLite index next to the file, so that each lookup reads a single
+record from the mapped file.
+
+The index assumes that each record is on a single line, as in the
+OpenCorporates bulk data files.
+
+"""
+
+# the approximate number of bytes in each chunk parsed by a worker process
+CHUNK_SIZE = 64 * 1024 * 1024
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _format(path):
+    """ Returns 'csv' or 'jsonl' for the bulk data file at path."""
+
+    name = path.lower()
+    for suffix in ('.gz', '.bz2', '.zip'):
+        if name.endswith(suffix):
+            raise ValueError('Decompress `%s` before indexing it.' % path)
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.jsonl') or name.endswith('.json'):
+        return 'jsonl'
+    raise ValueError('`%s` is not a CSV or JSON lines file.' % path)
+
+
+def _csv_values(line):
+    """ Returns the decoded fields of a single CSV line of bytes."""
+
+    if sys.version_info[0] < 3:
+        # the Python 2 csv module reads bytes, not unicode
+        return [value.decode('utf-8') for value in next(csv.reader([line]))]
+    return next(csv.reader(io.StringIO(line.decode('utf-8'))))
+
+
+def _parse(line, fmt, columns):
+    """ Parses a single line of a bulk data file into a record dict."""
+
+    line = line.rstrip(b'\r\n')
+    if fmt == 'jsonl':
+        record = json.loads(line.decode('utf-8'))
+        if isinstance(record.get('company'), dict):
+            record = record['company']
+        return record
+
+    values = _csv_values(line)
+    record = {}
+    for column, value in zip(columns, values):
+        if value == '':
+            value = None
+        # nest dotted columns, e.g. registered_address.locality
+        target = record
+        names = column.split('.')
+        for name in names[:-1]:
+            target = target.setdefault(name, {})
+        target[names[-1]] = value
+    return record
+
+
+def _index_chunk(path, start, end, fmt, columns):
+    """ Returns (key, offset, length) for each record in a chunk of path."""
+
+    entries = []
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            offset = start
+            while offset < end:
+                stop = mapped.find(b'\n', offset, end)
+                stop = end if stop == -1 else stop + 1
+                line = mapped[offset:stop]
+                if line.strip():
+                    try:
+                        record = _parse(line, fmt, columns)
+                    except (ValueError, StopIteration):
+                        record = {}
+                    jurisdiction = record.get('jurisdiction_code')
+                    number = record.get('company_number')
+                    if jurisdiction and number:
+                        key = node_key('companies', jurisdiction, number)
+                        entries.append((key, offset, stop - offset))
+                offset = stop
+        finally:
+            mapped.close()
+    return entries
+
+
+class DumpIndex(object):
+    """ An on-disk index of the companies in a bulk data file.
+
+    Examples
+    --------
+    dump = DumpIndex('gb_companies.csv', dumped_at=1546300800)
+    dump.build()
+    dump.get('companies/gb/00102498')['name']
+    engine = create_engine(dump=dump)
+
+    Parameters
+    ----------
+    path: str
+        The path of the CSV or JSON lines bulk data file.
+    index_path: str (optional)
+        The path of the SQLite index. Defaults to path + '.idx'.
+    dumped_at: float (optional)
+        The time the dump was taken, which is kept in the index. Required
+        unless the index was built with it.
+
+    Attributes
+    ----------
+    format: str
+        The format of the bulk data file, 'csv' or 'jsonl'.
+    columns: list
+        The columns of a CSV file.
+    dumped_at: float
+        The time the dump was taken, or None if it is unknown.
+
+    """
+
+    def __init__(self, path, index_path=None, dumped_at=None):
+
+        self.path = path
+        self.index_path = index_path or path + '.idx'
+        self.format = _format(path)
+        self.dumped_at = dumped_at
+        self.columns = None
+
+        self._file = open(path, 'rb')
+        self._mapped = mmap.mmap(self._file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        self._header = 0
+        if self.format == 'csv':
+            self._header = self._mapped.find(b'\n') + 1
+            header = self._mapped[:self._header]
+            if header.startswith(codecs.BOM_UTF8):
+                header = header[len(codecs.BOM_UTF8):]
+            self.columns = _csv_values(header.strip())
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._conn.executescript(INDEX_SCHEMA)
+        if self.dumped_at is None:
+            dumped_at = self._meta('dumped_at')
+            self.dumped_at = float(dumped_at) if dumped_at else None
+        else:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                    ('dumped_at', repr(float(self.dumped_at))))
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM records').fetchone()[0]
+
+    @property
+    def built(self):
+        """ Whether the index is up to date with the bulk data file."""
+
+        return self._meta('size') == str(len(self._mapped)) and \
+            self._meta('mtime') == repr(self._mtime()) and \
+            self._meta('dumped_at') is not None
+
+    def build(self, max_workers=None, chunk_size=CHUNK_SIZE):
+        """ Parses the bulk data file in parallel and builds the index.
+
+        Parameters
+        ----------
+        max_workers: int (optional)
+            The number of worker processes. Defaults to the number of CPUs.
+        chunk_size: int (optional)
+            The approximate number of bytes parsed by each worker task.
+
+        Returns
+        -------
+        int
+            The number of records in the index.
+
+        """
+
+        if self.dumped_at is None:
+            raise ValueError('The time `%s` was dumped is required to build '
+                             'its index.' % self.path)
+
+        # split the file into chunks that end at line boundaries
+        size = len(self._mapped)
+        bounds = []
+        start = self._header
+        while start < size:
+            end = self._mapped.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            bounds.append((start, end))
+            start = end
+
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM records')
+            self._conn.execute('DELETE FROM meta')
+
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [pool.submit(_index_chunk, self.path, start, end,
+                                   self.format, self.columns)
+                       for start, end in bounds]
+            for future in futures:
+                entries = future.result()
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO records VALUES (?, ?, ?)',
+                        entries)
+        finally:
+            pool.shutdown(wait=True)
+
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('size', str(size)), ('mtime', repr(self._mtime())),
+                ('dumped_at', repr(float(self.dumped_at)))])
+        return len(self)
+
+    def get(self, key):
+        """ Returns the record for a key, or None if it is not in the dump.
+
+        Parameters
+        ----------
+        key: str
+            A route key, e.g. 'companies/gb/00102498'.
+
+        """
+
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return _parse(self._mapped[offset:offset + length], self.format,
+                      self.columns)
+
+    def close(self):
+        """ Closes the bulk data file and the index."""
+
+        with self._lock:
+            self._conn.close()
+        self._mapped.close()
+        self._file.close()
+
+    def _meta(self, name):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def _mtime(self):
+        return os.fstat(self._file.fileno()).st_mtime
+
+    def _lookup(self, key):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT offset, length FROM records WHERE key = ?',
+                (key,)).fetchone()
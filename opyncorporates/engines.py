@@ -1,10 +1,31 @@
 import abc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from functools import partial
+
+import requests
 
 from opyncorporates.api import (
+    BASE_URL,
+    DEFAULT_TIMEOUT,
+    build_response,
     Request,
     FetchRequest,
+    MatchRequest,
     SearchRequest
 )
+from opyncorporates.dumps import DumpIndex
+from opyncorporates.flight import SingleFlight, canonical_url
+from opyncorporates.graph import Crawler, node_key
+from opyncorporates.hedging import Hedger
+from opyncorporates.planning import Planner
+from opyncorporates.reconcile import Reconciler
+from opyncorporates.refresh import Refresher
+from opyncorporates import scheduling
+from opyncorporates.scheduling import Scheduler
+from opyncorporates.store import EntityStore, entity_key
+from opyncorporates.tokens import TokenPool, with_token
 
 """Version strategies for creating new instances of Engine types.
 
@@ -44,21 +65,356 @@ class EngineAbstract(object):
 class BaseEngine(EngineAbstract):
 
     def __init__(self, api_version, search_types, fetch_types,
-                 match_types, api_token):
+                 match_types, api_token, max_workers=8, api_tokens=None,
+                 rate_limit=None, timeout=DEFAULT_TIMEOUT, hedge=None,
+                 store=None, dump=None, coalesce=True, scheduler=None,
+                 refresh=None):
 
         self.api_version = api_version
         self.api_token = api_token
         self.search_types = search_types
         self.fetch_types = fetch_types
         self.match_types = match_types
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.timeout = timeout
+
+        if hedge is True:
+            hedge = Hedger(max_workers=2 * max_workers)
+        self.hedger = hedge or None
+        self.flights = SingleFlight() if coalesce else None
+
+        if scheduler is True:
+            scheduler = Scheduler(max_concurrent=max_workers)
+        self.scheduler = scheduler or None
+
+        if isinstance(store, str):
+            store = EntityStore(store)
+        self.store = store
+
+        if isinstance(dump, str):
+            dump = DumpIndex(dump)
+            if not dump.built:
+                dump.build()
+        self.dump = dump
+
+        # the pool always holds at least the engine's own token
+        api_tokens = list(api_tokens or [])
+        if api_token not in api_tokens:
+            api_tokens.insert(0, api_token)
+        if len(api_tokens) > 1 and None in api_tokens:
+            api_tokens.remove(None)
+        self.tokens = TokenPool(api_tokens, rate_limit=rate_limit)
+
+        if refresh is not None and not isinstance(refresh, Refresher):
+            refresh = Refresher(soft_ttl=refresh)
+        if refresh is not None:
+            if self.store is None:
+                raise ValueError('Refreshing entities requires a store.')
+            if rate_limit:
+                refresh.limit(rate_limit * len(self.tokens))
+        self.refresher = refresh
 
         engines[self.api_version] = self.__class__
 
+    def send(self, url):
+        """ Submits a GET request for url and returns the response.
+
+        All requests created by the engine are submitted through this
+        method, which reuses the connections held by the engine's session
+        and signs each request with the token from the engine's token pool
+        with the most remaining capacity. If the response shows that the
+        token was throttled or exhausted, the request is retried once with
+        each of the other tokens in the pool.
+
+        Each request is bound by the engine's connect and read timeouts.
+        If the engine hedges requests, a duplicate request is submitted when
+        a request is slower than the hedger's latency percentile.
+
+        If the engine has an entity store, fetches of single entities are
+        answered from the store when it holds a fresh copy, and successful
+        responses are written to the store. Otherwise, if the engine has a
+        bulk data dump, fetches of companies in the dump are answered from
+        the dump, and the API is called only for companies added since, or
+        whose stale stored copy is newer than the dump.
+
+        If the engine has a refresher, reads of each stored entity are
+        counted. Once the stored copy of a hot entity is older than the
+        refresher's soft TTL, the copy is still returned at once, and the
+        entity is refetched in the background at background priority.
+
+        Identical requests submitted by several threads at the same time
+        are coalesced into a single call to the API, whose response is
+        shared by all of the threads. With a scheduler, only requests of
+        the same priority class are coalesced.
+
+        If the engine has a scheduler, each call to the API waits for a
+        slot in the priority class and job set by the engine's priority
+        method. Bulk methods such as crawl, fetch_many and iteration over
+        search results run at bulk priority unless another is set.
+
+        """
+
+        key = None
+        if self.store is not None or self.dump is not None:
+            key = entity_key(url)
+
+        fresh = key is not None and self.store is not None \
+            and self.store.fresh(key)
+
+        if key is not None and self.refresher is not None:
+            # count the read, and refresh a hot copy past its soft TTL
+            fetched_at = self.store.fetched_at(key) if fresh else None
+            self.refresher.access(key, fetched_at, self._revalidate)
+
+        if fresh:
+            response = self._local_response(url, self.store.get_results(key))
+            response.from_store = True
+            return response
+
+        if key is not None and self._use_dump(key):
+            record = self.dump.get(key)
+            if record is not None:
+                response = self._local_response(url, {'company': record})
+                response.from_dump = True
+                return response
+
+        if self.flights is not None:
+            response, shared = self.flights.do(self._flight_key(url),
+                                               self._send, url)
+            if shared:
+                # the caller that submitted the request stores the response
+                return copy.copy(response)
+        else:
+            response = self._send(url)
+
+        if key is not None and self.store is not None \
+                and response.status_code == 200:
+            self.store.put(key, response.json()['results'])
+        return response
+
+    def _revalidate(self, key):
+        """ Refetches a stored entity from the API and stores the result."""
+
+        url = '%s/v%s/%s' % (BASE_URL, self.api_version, key)
+        if self.flights is not None:
+            response, shared = self.flights.do(self._flight_key(url),
+                                               self._send, url)
+            if shared:
+                # the caller that submitted the request stores the response
+                return
+        else:
+            response = self._send(url)
+        if response.status_code == 200:
+            self.store.put(key, response.json()['results'])
+
+    def _flight_key(self, url):
+        """ Returns the key under which identical calls are coalesced.
+
+        With a scheduler, calls are only coalesced within a priority class,
+        so that an interactive call never waits for the slot of a bulk or
+        background call.
+
+        """
+
+        key = canonical_url(url)
+        if self.scheduler is None:
+            return key
+        context = scheduling.current()
+        return key, (context and context[0]) or scheduling.DEFAULT_PRIORITY
+
+    def _use_dump(self, key):
+        """ Returns True if the dump is at least as recent as the store.
+
+        A stale stored copy fetched after the dump was taken is newer than
+        the dump's record, so it is refetched from the API instead.
+
+        """
+
+        if self.dump is None:
+            return False
+        if self.store is None:
+            return True
+        fetched_at = self.store.fetched_at(key)
+        return fetched_at is None or fetched_at < self.dump.dumped_at
+
+    def _local_response(self, url, results):
+        """ Returns a response for url built from a local results dict."""
+
+        return build_response(data={'api_version': self.api_version,
+                                    'results': results}, url=url)
+
+    def _send(self, url):
+        if self.scheduler is None:
+            return self._send_with_tokens(url)
+        priority, job = scheduling.current() or (None, None)
+        with self.scheduler.slot(priority, job):
+            rank = self.scheduler.rank(priority)
+            return self._send_with_tokens(url, rank)
+
+    def _send_with_tokens(self, url, rank=0):
+        tried = []
+        response = None
+        while len(tried) < len(self.tokens):
+            try:
+                api_token = self.tokens.acquire(exclude=tried, rank=rank)
+            except RuntimeError:
+                if response is None:
+                    raise
+                return response
+            tried.append(api_token)
+            if self.tokens.recheck(api_token):
+                # the token is back from exhaustion: check its quota first
+                self._refresh_quota(api_token)
+                if len(self.tokens) > 1 and \
+                        self.tokens.tokens[api_token].exhausted:
+                    self.tokens.release(api_token)
+                    continue
+            response = None
+            try:
+                if api_token is not None:
+                    url = with_token(url, api_token)
+                response = self._get(url, rank)
+            finally:
+                # a duplicate's response releases the duplicate's token
+                own = None if getattr(response, 'hedged', False) \
+                    else response
+                retry = self.tokens.release(api_token, own)
+            if not retry:
+                break
+        return response
+
+    def _get(self, url, rank=0):
+        """ Calls the API for a signed url, hedging the call if enabled.
+
+        Only the call itself is hedged and timed, once its token (and its
+        scheduler slot) are held, so that waits for tokens and slots do not
+        count towards the hedger's latency percentile.
+
+        """
+
+        if self.hedger is None:
+            return self.session.get(url, timeout=self.timeout)
+        return self.hedger.call(self.session.get, url, timeout=self.timeout,
+                                hedge=partial(self._duplicate, rank=rank))
+
+    def _duplicate(self, url, timeout=None, rank=0):
+        """ Calls the API for url with a token of its own."""
+
+        api_token = self.tokens.acquire(rank=rank)
+        response = None
+        try:
+            response = self.session.get(with_token(url, api_token),
+                                        timeout=timeout)
+            response.hedged = True
+        finally:
+            self.tokens.release(api_token, response)
+        return response
+
+    def refresh_quotas(self):
+        """ Updates each pooled token's quota from its account status.
+
+        Returns
+        -------
+        remaining: int
+            The total number of calls remaining across the pool, or None if
+            it is unknown.
+
+        """
+
+        for api_token in list(self.tokens.tokens):
+            self._refresh_quota(api_token)
+
+        return self.tokens.remaining
+
+    def _refresh_quota(self, api_token):
+        """ Updates a token's quota from its account status."""
+
+        if api_token is None:
+            return
+        url = Request(self.api_version, 'account_status',
+                      api_token=api_token).url
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code == 200:
+            results = response.json()['results']
+            self.tokens.update(api_token, results.get('account_status'))
+
+    def priority(self, name, job=None):
+        """ Sets the priority class and job of requests made in a block.
+
+        Examples
+        --------
+        with engine.priority('bulk', job='nightly-crawl'):
+            for item in engine.search('companies', q='bank').results:
+                ...
+
+        Parameters
+        ----------
+        name: str
+            The priority class: 'interactive', 'bulk' or 'background'.
+        job: str (optional)
+            The job the requests belong to. Requests of the same class are
+            shared fairly between jobs. Defaults to the thread's name.
+
+        """
+        return scheduling.priority(name, job)
+
     def request(self, *args, **kwargs):
+        kwargs['engine'] = self
         return Request(*args, **kwargs)
 
-    def match(self, *args, **kwargs):
-        return
+    def match(self, match_type, *args, **kwargs):
+
+        if match_type not in self.match_types:
+            msg = "`%s` not available in v%s" % (match_type, self.api_version)
+            raise NotImplementedError(msg)
+
+        q = kwargs.pop('q', None)
+        if q is None:
+            msg = "Please provide a value for q as a keyword argument."
+            raise ValueError(msg)
+
+        # construct request_vars
+        request_vars = dict()
+        if self.api_token is not None:
+            kwargs['api_token'] = self.api_token
+        for k, v in kwargs.items():
+            request_vars[k] = v
+
+        return MatchRequest(self.api_version, match_type, *args, q=q,
+                            engine=self, **request_vars)
+
+    def paginate(self, *args, **kwargs):
+        """ Iterates over every item of a paginated collection.
+
+        Examples
+        --------
+        for filing in engine.paginate('v0.4', 'companies', 'gb', '00102498',
+                                      'filings', per_page=100):
+            ...
+
+        Parameters
+        ----------
+        args: list
+            A Request object, or the args of a request (see request).
+        kwargs: dict (optional)
+            The request vars of the request, and the max_workers and unwrap
+            options of the paginator.
+
+        Returns
+        -------
+        paginator: obj
+            A Paginator object which yields the items of every page.
+
+        """
+
+        options = dict((k, kwargs.pop(k)) for k in ('max_workers', 'unwrap')
+                       if k in kwargs)
+        if len(args) == 1 and isinstance(args[0], Request):
+            request = args[0]
+        else:
+            request = self.request(*args, **kwargs)
+        return request.paginate(**options)
 
     def search(self, search_type, *args, **kwargs):
 
@@ -83,7 +439,7 @@ class BaseEngine(EngineAbstract):
         for k, v in kwargs.items():
             request_vars[k] = v
 
-        return SearchRequest(*args, q=q, **request_vars)
+        return SearchRequest(*args, q=q, engine=self, **request_vars)
 
     def fetch(self, fetch_type, *args, **kwargs):
 
@@ -91,15 +447,11 @@ class BaseEngine(EngineAbstract):
             msg = "`%s` not available in v%s" % (fetch_type, self.api_version)
             raise NotImplementedError(msg)
 
-        if len(args) == 0:
+        # account_status is the only fetch type without an identifier
+        if len(args) == 0 and fetch_type != 'account_status':
             msg = "Please provide an identifier value as a positional argument."
             raise ValueError(msg)
 
-        # construct args
-        args = list(args)
-        args.insert(0, "v%s" % self.api_version)
-        args.insert(1, fetch_type)
-
         # construct request_vars
         request_vars = dict()
         if self.api_token is not None:
@@ -107,7 +459,131 @@ class BaseEngine(EngineAbstract):
         for k, v in kwargs.items():
             request_vars[k] = v
 
-        return FetchRequest(fetch_type, *args, **request_vars)
+        return FetchRequest(self.api_version, fetch_type, *args,
+                            engine=self, **request_vars)
+
+    def fetch_many(self, fetch_type, identifiers, max_workers=None, **kwargs):
+        """ Fetches many items concurrently.
+
+        Parameters
+        ----------
+        fetch_type: str
+            The type of the items to fetch.
+        identifiers: iterable
+            The identifiers of each item, either as a single value or as a
+            tuple of positional arguments (e.g. ('gb', '00102498')).
+        max_workers: int (optional)
+            The maximum number of concurrent requests. Defaults to the
+            engine's max_workers.
+
+        Yields
+        ------
+        fetch: obj
+            A FetchRequest object for each identifier, in input order.
+
+        """
+
+        def _fetch(identifier):
+            if not isinstance(identifier, (list, tuple)):
+                identifier = (identifier,)
+            return self.fetch(fetch_type, *identifier, **dict(kwargs))
+
+        _fetch = scheduling.bind(_fetch, default='bulk')
+
+        max_workers = max_workers or self.max_workers
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        pending = deque()
+        try:
+            # keep a bounded window of requests in flight so that
+            # identifiers can be consumed lazily
+            for identifier in identifiers:
+                pending.append(pool.submit(_fetch, identifier))
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def cached(self, fetch_type, *args):
+        """ Returns True if a fetch can be served without calling the API."""
+
+        key = node_key(fetch_type, *args)
+        if self.store is not None and self.store.fresh(key):
+            return True
+        return self._use_dump(key) and key in self.dump
+
+    def planner(self, **kwargs):
+        """ Returns a Planner for estimating the cost of jobs on the engine.
+
+        Examples
+        --------
+        plan = engine.planner().add_search('companies', q='bp').plan()
+        plan.calls, plan.seconds, plan.within_quota
+
+        """
+        return Planner(self, **kwargs)
+
+    def reconcile(self, names, jurisdiction_code=None, **kwargs):
+        """ Matches company names to companies, one search per distinct name.
+
+        Examples
+        --------
+        for name, company, score in engine.reconcile(names, 'gb'):
+            ...
+
+        Parameters
+        ----------
+        names: list
+            The company names to match. May be any iterable.
+        jurisdiction_code: str (optional)
+            Restricts matches to a jurisdiction.
+        kwargs: dict (optional)
+            per_page, threshold and max_workers options for the Reconciler.
+
+        Returns
+        -------
+        generator
+            (name, best_match, score) tuples in the order of names.
+
+        """
+
+        reconciler = Reconciler(self, jurisdiction_code=jurisdiction_code,
+                                **kwargs)
+        return reconciler.reconcile(names)
+
+    def crawl(self, seeds, edge_types=None, max_depth=1, max_nodes=None,
+              max_workers=None):
+        """ Traverses the corporate network breadth-first from seeds.
+
+        Parameters
+        ----------
+        seeds: list
+            Node keys (e.g. 'companies/gb/00102498') or (object_type, *args)
+            tuples to start the crawl from.
+        edge_types: list (optional)
+            The relationships to follow: any of 'officers', 'filings',
+            'corporate_groupings' and 'statements'. Defaults to all.
+        max_depth: int (optional)
+            The maximum number of hops from a seed. Defaults to 1.
+        max_nodes: int (optional)
+            The maximum number of nodes to visit, including the seeds.
+        max_workers: int (optional)
+            The maximum number of concurrent fetches. Defaults to the
+            engine's max_workers.
+
+        Returns
+        -------
+        crawler: obj
+            A Crawler object which yields Node and Edge tuples as they are
+            discovered.
+
+        """
+
+        return Crawler(self, seeds, edge_types=edge_types, max_depth=max_depth,
+                       max_nodes=max_nodes, max_workers=max_workers)
 
 
 class EngineV04(BaseEngine):
@@ -115,7 +591,10 @@ class EngineV04(BaseEngine):
 
 
     """
-    def __init__(self, api_token=None):
+    def __init__(self, api_token=None, max_workers=8, api_tokens=None,
+                 rate_limit=None, timeout=DEFAULT_TIMEOUT, hedge=None,
+                 store=None, dump=None, coalesce=True, scheduler=None,
+                 refresh=None):
 
         api_version = '0.4'
 
@@ -144,7 +623,15 @@ class EngineV04(BaseEngine):
         match_types = ['jurisdictions']
 
         super(EngineV04, self).__init__(api_version, search_types, fetch_types,
-                                     match_types, api_token)
+                                     match_types, api_token,
+                                     max_workers=max_workers,
+                                     api_tokens=api_tokens,
+                                     rate_limit=rate_limit,
+                                     timeout=timeout, hedge=hedge,
+                                     store=store, dump=dump,
+                                     coalesce=coalesce,
+                                     scheduler=scheduler,
+                                     refresh=refresh)
 
 
 # build versions dict by instantiating class objects
@@ -0,0 +1,103 @@
+from concurrent.futures import Future
+import threading
+
+"""Coalescing of identical in-flight requests.
+
+When several threads request the same url at the same time, a
+:class:`SingleFlight` object lets the first of them (the leader) submit the
+request while the others wait for and share its response. Once the
+leader's request completes, the next request for the url is submitted
+again, so responses are never cached beyond the lifetime of a request.
+
+"""
+
+
+def canonical_url(url):
+    """ Returns url with sorted request vars and without its api_token.
+
+    Urls that differ only in the order of their request vars or in their
+    api_token request the same resource.
+
+    Examples
+    --------
+    canonical_url('/companies/search?q=bp&api_token=x&per_page=100')
+        --> '/companies/search?per_page=100&q=bp'
+
+    """
+
+    route, _, query = str(url).partition('?')
+    request_vars = sorted(v for v in query.split('&')
+                          if v and not v.startswith('api_token='))
+    if not request_vars:
+        return route
+    return '%s?%s' % (route, '&'.join(request_vars))
+
+
+class SingleFlight(object):
+    """ Shares the result of a call among concurrent callers with one key.
+
+    Examples
+    --------
+    flights = SingleFlight()
+    response, shared = flights.do(canonical_url(url), session.get, url)
+
+    """
+
+    def __init__(self):
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, *args, **kwargs):
+        """ Calls fn, unless a call with the same key is already in flight.
+
+        If a call with key is in flight, waits for it and returns its result
+        or raises its exception. Otherwise calls fn(*args, **kwargs).
+
+        Parameters
+        ----------
+        key: str
+            The key identifying identical calls.
+        fn: callable
+            The function to call.
+        timeout: float (optional)
+            The number of seconds to wait for a call in flight before
+            raising concurrent.futures.TimeoutError. The call itself is not
+            cancelled, and its result is still shared with other callers.
+
+        Returns
+        -------
+        (result, shared): tuple
+            The result of the call, and whether it was shared with another
+            caller that submitted the call.
+
+        """
+
+        timeout = kwargs.pop('timeout', None)
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(timeout=timeout), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,291 @@
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    from urllib.parse import quote, unquote
+except ImportError:  # pragma: no cover
+    from urllib import quote, unquote
+
+import requests
+
+from opyncorporates.scheduling import bind
+
+"""Breadth-first traversal of the corporate network.
+
+The :class:`Crawler` class starts from one or more seed objects and follows
+the relationships embedded in each fetched record (a company's officers,
+filings, corporate groupings and statements, and the company referenced by
+each of those objects) a fixed number of hops deep.
+
+Every object in the crawl is identified by a node key, which is the route
+used to fetch it from the opencorporates API without the API version, e.g.
+``companies/gb/00102498`` or ``officers/123456``. Only node keys are kept in
+the crawler's visited set, so memory use grows with the number of objects
+visited rather than with the size of their records.
+
+"""
+
+Node = namedtuple('Node', ['key', 'object_type', 'depth', 'data'])
+Edge = namedtuple('Edge', ['source', 'target', 'edge_type'])
+
+EDGE_TYPES = (
+    'officers',
+    'filings',
+    'corporate_groupings',
+    'statements',
+)
+
+# item keys used by the opencorporates API when nesting each edge type
+ITEM_KEYS = {
+    'officers': 'officer',
+    'filings': 'filing',
+    'corporate_groupings': 'corporate_grouping',
+    'statements': 'statement',
+}
+
+
+def node_key(object_type, *args):
+    """ Returns the node key for an object type and its identifiers.
+
+    Examples
+    --------
+    node_key('companies', 'gb', '00102498') --> 'companies/gb/00102498'
+    node_key('corporate_groupings', 'bp') --> 'corporate_groupings/bp'
+
+    """
+
+    parts = [object_type]
+    parts.extend([quote(str(a), safe='') for a in args])
+    return '/'.join(parts)
+
+
+def parse_key(key):
+    """ Splits a node key or route into an object type and identifiers.
+
+    A leading '/' and API version (e.g. 'v0.4') are ignored, so that routes
+    such as '/v0.4/companies/gb/00102498' can be used as seeds.
+
+    """
+
+    parts = [p for p in str(key).split('?')[0].split('/') if p]
+    if parts and parts[0].startswith('v') and parts[0][1:2].isdigit():
+        parts.pop(0)
+    return parts[0], [unquote(p) for p in parts[1:]]
+
+
+def _company_key(company):
+    """ Returns the node key for a nested company dict, if any."""
+
+    if not isinstance(company, dict):
+        return None
+    jurisdiction = company.get('jurisdiction_code')
+    number = company.get('company_number')
+    if not jurisdiction or not number:
+        return None
+    return node_key('companies', jurisdiction, number)
+
+
+def _items(record, name):
+    """ Yields the nested items listed under record[name]."""
+
+    item_key = ITEM_KEYS.get(name)
+    values = record.get(name) or []
+    if isinstance(values, dict):
+        # e.g. {'most_recent': [...], 'total_count': 10}
+        values = values.get('most_recent') or []
+    for value in values:
+        if not isinstance(value, dict):
+            continue
+        if item_key in value:
+            value = value[item_key]
+        elif len(value) == 1:
+            value = list(value.values())[0]
+        if isinstance(value, dict):
+            yield value
+
+
+def neighbours(key, record, edge_types=EDGE_TYPES):
+    """ Yields (node key, edge type) pairs for the objects linked to record.
+
+    Parameters
+    ----------
+    key: str
+        The node key of the record.
+    record: dict
+        The record returned by the opencorporates API for key.
+    edge_types: list (optional)
+        The edge types to follow.
+
+    """
+
+    object_type = parse_key(key)[0]
+
+    if object_type == 'companies':
+        for edge_type in edge_types:
+            if edge_type == 'corporate_groupings':
+                for item in _items(record, edge_type):
+                    if item.get('name'):
+                        yield node_key(edge_type, item['name']), edge_type
+                continue
+            names = [edge_type]
+            if edge_type == 'statements':
+                # statements are listed as data in v0.4 company records
+                names.append('data')
+            for name in names:
+                for item in _items(record, name):
+                    if item.get('id') is not None:
+                        yield node_key(edge_type, item['id']), edge_type
+        return
+
+    if object_type not in edge_types:
+        return
+
+    target = _company_key(record.get('company'))
+    if target is not None:
+        yield target, object_type
+
+    # corporate groupings list their member companies as memberships
+    for membership in _items(record, 'memberships'):
+        target = _company_key(membership.get('company', membership))
+        if target is not None:
+            yield target, object_type
+
+
+class Crawler(object):
+    """ Traverses the corporate network breadth-first from a set of seeds.
+
+    Records are fetched concurrently by a pool of worker threads, and
+    nodes and edges are yielded as soon as they are discovered. Nodes are
+    yielded in the order their fetches complete, but are scheduled in
+    breadth-first order, so that no node is fetched before every node
+    closer to the seeds has been scheduled.
+
+    Examples
+    --------
+    crawler = Crawler(engine, ['companies/gb/00102498'],
+                      edge_types=['officers'], max_depth=2)
+    for item in crawler:
+        if isinstance(item, Node):
+            ...
+
+    Parameters
+    ----------
+    engine: obj
+        The engine used to fetch records.
+    seeds: list
+        Node keys (e.g. 'companies/gb/00102498') or (object_type, *args)
+        tuples to start the crawl from.
+    edge_types: list (optional)
+        The relationships to follow. Defaults to all of EDGE_TYPES.
+    max_depth: int (optional)
+        The maximum number of hops from a seed. Defaults to 1.
+    max_nodes: int (optional)
+        The maximum number of nodes to visit, including the seeds.
+    max_workers: int (optional)
+        The maximum number of concurrent fetches. Defaults to the engine's
+        max_workers.
+
+    Attributes
+    ----------
+    visited: set
+        The node keys scheduled for fetching so far.
+
+    """
+
+    def __init__(self, engine, seeds, edge_types=None, max_depth=1,
+                 max_nodes=None, max_workers=None):
+
+        edge_types = list(edge_types or EDGE_TYPES)
+        for edge_type in edge_types:
+            if edge_type not in EDGE_TYPES:
+                raise ValueError('`%s` is not a valid edge type.' % edge_type)
+
+        self.engine = engine
+        self.edge_types = edge_types
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_workers = max_workers or engine.max_workers
+        self.visited = set()
+
+        self._edges = set()
+        self._queue = deque()
+
+        for seed in seeds:
+            if isinstance(seed, (list, tuple)):
+                object_type, args = seed[0], seed[1:]
+            else:
+                object_type, args = parse_key(seed)
+            self._visit(node_key(object_type, *args), 0)
+
+    def __iter__(self):
+        return self.crawl()
+
+    def crawl(self):
+        """ Yields Node and Edge tuples as they are discovered."""
+
+        in_flight = {}
+        fetch = bind(self._fetch, default='bulk')
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while self._queue or in_flight:
+                while self._queue and len(in_flight) < self.max_workers:
+                    key, depth = self._queue.popleft()
+                    future = pool.submit(fetch, key)
+                    in_flight[future] = (key, depth)
+
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, depth = in_flight.pop(future)
+                    record = future.result()
+                    if record is None:
+                        continue
+                    yield Node(key, parse_key(key)[0], depth, record)
+                    for edge in self._expand(key, depth, record):
+                        yield edge
+        finally:
+            for future in in_flight:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _fetch(self, key):
+        """ Returns the record for key, or None if it cannot be fetched.
+
+        Network errors and timeouts skip the record rather than ending the
+        crawl.
+
+        """
+
+        object_type, args = parse_key(key)
+        try:
+            fetch = self.engine.fetch(object_type, *args)
+            return fetch.results or None
+        except requests.RequestException:
+            return None
+
+    def _visit(self, key, depth):
+        """ Schedules key for fetching if it has not been visited."""
+
+        if key in self.visited:
+            return True
+        if self.max_nodes is not None and len(self.visited) >= self.max_nodes:
+            return False
+        self.visited.add(key)
+        self._queue.append((key, depth))
+        return True
+
+    def _expand(self, key, depth, record):
+        """ Schedules the neighbours of key and yields the new edges."""
+
+        for target, edge_type in neighbours(key, record, self.edge_types):
+            if target == key:
+                continue
+            if depth >= self.max_depth and target not in self.visited:
+                continue
+            if not self._visit(target, depth + 1):
+                continue
+            # edges are found from both ends; report each only once
+            ends = (key, target) if key < target else (target, key)
+            if ends + (edge_type,) in self._edges:
+                continue
+            self._edges.add(ends + (edge_type,))
+            yield Edge(key, target, edge_type)
@@ -0,0 +1,160 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+"""Hedged requests for bounding tail latency.
+
+A hedged call submits a request and, if no response has arrived once the
+call has taken longer than a running percentile of recent latencies, submits
+a duplicate request and returns whichever response arrives first. The number
+of duplicate requests is capped at a fraction of all requests, so that
+hedging adds a small, bounded load to the API.
+
+"""
+
+
+class LatencyTracker(object):
+    """ Tracks a rolling window of call latencies.
+
+    Parameters
+    ----------
+    window: int (optional)
+        The number of recent latencies to keep. Defaults to 200.
+
+    """
+
+    def __init__(self, window=200):
+
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def add(self, seconds):
+        """ Records the latency of a call."""
+
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, percentile):
+        """ Returns the latency at percentile (0-100), or None if empty."""
+
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        index = int(round((len(latencies) - 1) * percentile / 100.0))
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+
+class Hedger(object):
+    """ Issues duplicate calls when a call exceeds a latency percentile.
+
+    Examples
+    --------
+    hedger = Hedger(percentile=95, budget=0.05)
+    response = hedger.call(session.get, url)
+
+    Parameters
+    ----------
+    percentile: float (optional)
+        The latency percentile after which a duplicate call is issued.
+        Defaults to 95.
+    budget: float (optional)
+        The maximum number of duplicate calls as a fraction of all calls.
+        Defaults to 0.05.
+    min_samples: int (optional)
+        The number of latencies to record before hedging. Defaults to 20.
+    max_workers: int (optional)
+        The number of threads used to run calls. Defaults to 16.
+
+    Attributes
+    ----------
+    latencies: obj
+        The LatencyTracker for calls made through the hedger.
+    calls: int
+        The number of calls made through the hedger.
+    hedged: int
+        The number of duplicate calls issued.
+
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20,
+                 max_workers=16):
+
+        if not 0 < percentile < 100:
+            raise ValueError('Hedging percentile must be between 0 and 100.')
+
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker()
+        self.calls = 0
+        self.hedged = 0
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        """ The seconds to wait before issuing a duplicate call, or None."""
+
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def call(self, fn, *args, **kwargs):
+        """ Calls fn, issuing a duplicate call if it is slow to return.
+
+        The result of whichever call returns first is returned. If that call
+        raises an exception, the other call's result is returned instead,
+        and the exception is raised only if both calls fail.
+
+        Parameters
+        ----------
+        fn: callable
+            The function to call. Only this first call is timed.
+        hedge: callable (optional)
+            The function called with the same arguments for the duplicate
+            call, e.g. to sign it with another API token. Defaults to fn.
+
+        """
+
+        hedge = kwargs.pop('hedge', None) or fn
+        with self._lock:
+            self.calls += 1
+
+        delay = self.delay
+        futures = [self._pool.submit(self._timed, fn, *args, **kwargs)]
+        if delay is None:
+            return futures[0].result()
+
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._allow():
+            futures.append(self._pool.submit(hedge, *args, **kwargs))
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None or not futures:
+                    for other in futures:
+                        other.cancel()
+                    return future.result()
+
+    def _allow(self):
+        """ Returns True if the budget allows another duplicate call."""
+
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def _timed(self, fn, *args, **kwargs):
+        start = time.time()
+        result = fn(*args, **kwargs)
+        self.latencies.add(time.time() - start)
+        return result
@@ -0,0 +1,208 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import re
+
+from opyncorporates.scheduling import bind
+
+"""Concurrent pagination of any collection request.
+
+Searches are not the only paginated endpoints of the opencorporates API: a
+company's filings, officers or statements, and the memberships of a
+corporate grouping, are returned a page at a time too. A :class:`Paginator`
+reads the pagination metadata (page, per_page, total_pages and total_count)
+from a request's first response, wherever it is nested in the results, and
+requests the remaining pages concurrently through the request's engine.
+
+"""
+
+# keys that mark a dict as holding a page of a collection
+PAGE_KEYS = ('total_pages', 'total_count')
+
+
+def with_page(url, page):
+    """ Returns url with its page request variable set to page."""
+
+    url = re.sub(r'([?&])page=[^&]*&?', r'\1', url).rstrip('?&')
+    separator = '&' if '?' in url else '?'
+    return '%s%spage=%s' % (url, separator, page)
+
+
+def find_page(data):
+    """ Finds the paginated collection in a decoded response.
+
+    Searches data breadth-first for a dict with pagination metadata and a
+    single list of items, e.g. {'filings': [...], 'page': 1, 'per_page': 30,
+    'total_pages': 4, 'total_count': 97}.
+
+    Returns
+    -------
+    (path, key, meta): tuple
+        The path of keys to the dict, the key of its list of items, and a
+        dict of its page, per_page, total_pages and total_count values as
+        ints (or None where missing). Returns None if data holds no
+        paginated collection.
+
+    """
+
+    queue = deque([((), data)])
+    while queue:
+        path, value = queue.popleft()
+        if not isinstance(value, dict):
+            continue
+        lists = [k for k, v in value.items() if isinstance(v, list)]
+        if len(lists) == 1 and any(k in value for k in PAGE_KEYS):
+            meta = {}
+            for k in ('page', 'per_page', 'total_pages', 'total_count'):
+                try:
+                    meta[k] = int(value[k])
+                except (KeyError, TypeError, ValueError):
+                    meta[k] = None
+            return path, lists[0], meta
+        for k, v in value.items():
+            queue.append((path + (k,), v))
+    return None
+
+
+class Paginator(object):
+    """ Iterates over every item of a paginated request.
+
+    The request's own response is used as the first page. The remaining
+    pages are requested concurrently through the request's engine, so they
+    share its session, tokens, rate limit and scheduler, and the items are
+    yielded in order as the pages arrive. Requests without pagination
+    metadata are treated as a single page.
+
+    Examples
+    --------
+    request = engine.request('v0.4', 'companies', 'gb', '00102498',
+                             'filings')
+    for filing in Paginator(request):
+        ...
+
+    Parameters
+    ----------
+    request: obj
+        A Request object for the first page of a collection.
+    max_workers: int (optional)
+        The maximum number of pages requested at once. Defaults to the
+        engine's max_workers, or 4 without an engine.
+    unwrap: bool (optional)
+        Whether to unwrap items that are wrapped in a single-key dict, such
+        as {'filing': {...}}. Defaults to True.
+
+    Attributes
+    ----------
+    meta: dict
+        The pagination metadata of the first page, or None.
+
+    """
+
+    def __init__(self, request, max_workers=None, unwrap=True):
+
+        engine = request.engine
+        self.request = request
+        self.max_workers = max_workers or getattr(engine, 'max_workers', 4)
+        self.unwrap = unwrap
+
+        response = request.response
+        if response.status_code != 200:
+            msg = 'Failed to get the first page of %s.' % request.url
+            raise RuntimeError(msg)
+
+        found = find_page(json.loads(response.text))
+        self._first = response
+        self._path, self._key, self.meta = found or (None, None, None)
+
+    def __len__(self):
+        total_count = self.total_count
+        if total_count is None:
+            raise TypeError('The number of items in the collection is '
+                            'unknown.')
+        return total_count
+
+    @property
+    def total_count(self):
+        """ The number of items in the collection, or None if unknown."""
+
+        if self.meta is None:
+            return len(self._items(self._first))
+        return self.meta['total_count']
+
+    @property
+    def total_pages(self):
+        """ The number of pages in the collection."""
+
+        if self.meta is None:
+            return 1
+        if self.meta['total_pages'] is not None:
+            return self.meta['total_pages']
+        if self.meta['total_count'] is not None and self.meta['per_page']:
+            return -(-self.meta['total_count'] // self.meta['per_page'])
+        return 1
+
+    def __iter__(self):
+
+        for item in self._items(self._first):
+            yield item
+
+        first = (self.meta or {}).get('page') or 1
+        pages = range(first + 1, self.total_pages + 1)
+        if not pages:
+            return
+
+        fetch = bind(self._fetch, default='bulk')
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+        try:
+            # keep a bounded window of pages in flight
+            for page in pages:
+                pending.append(pool.submit(fetch, page))
+                if len(pending) >= 2 * self.max_workers:
+                    for item in pending.popleft().result():
+                        yield item
+            while pending:
+                for item in pending.popleft().result():
+                    yield item
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _fetch(self, page):
+        """ Requests a page and returns its items."""
+
+        url = with_page(self.request.url, page)
+        response = self.request.send(url)
+        if response.status_code != 200:
+            msg = 'Failed to get page %s of %s.' % (page, self.request.url)
+            raise RuntimeError(msg)
+        return self._items(response)
+
+    def _items(self, response):
+        """ Returns the items in a page response."""
+
+        data = json.loads(response.text)
+        if self._key is None:
+            # a single page, e.g. the results of a plain fetch
+            results = data.get('results', data) if isinstance(data, dict) \
+                else data
+            if isinstance(results, list):
+                items = results
+            else:
+                lists = [v for v in results.values() if isinstance(v, list)]
+                items = lists[0] if len(lists) == 1 else [results]
+        else:
+            items = self._lookup(data, self._path)[self._key]
+
+        if not self.unwrap:
+            return items
+        return [list(item.values())[0]
+                if isinstance(item, dict) and len(item) == 1 else item
+                for item in items]
+
+    @staticmethod
+    def _lookup(data, path):
+        for key in path:
+            data = data[key]
+        return data
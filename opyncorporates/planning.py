@@ -0,0 +1,234 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import math
+
+"""Dry-run cost planning for searches and bulk fetches.
+
+A :class:`Planner` estimates the number of API calls, result pages and the
+expected runtime of a job before it is run, so that expensive jobs can be
+scheduled, split or rejected before they use up an engine's quota.
+
+Each search is probed once with ``per_page=1``, which costs a single call
+and returns the search's ``total_count``. Bulk fetches are not probed; only
+identifiers that the engine reports as cached are subtracted from the
+estimate.
+
+"""
+
+# the number of results per page returned when per_page is not set
+DEFAULT_PER_PAGE = 30
+
+# the seconds assumed for a single call when no rate limit is configured
+DEFAULT_LATENCY = 0.5
+
+Estimate = namedtuple('Estimate', ['job', 'count', 'pages', 'calls', 'cached'])
+
+
+class Plan(object):
+    """ The estimated cost of a set of jobs.
+
+    Attributes
+    ----------
+    estimates: list
+        An Estimate tuple for each job.
+    probes: int
+        The number of count probes made to build the plan.
+    calls: int
+        The estimated number of calls required to run the jobs.
+    pages: int
+        The estimated number of search result pages.
+    cached: int
+        The number of fetches that can be served by the engine's cache.
+    seconds: float
+        The estimated number of seconds required to run the jobs.
+    remaining: int
+        The number of calls remaining in the engine's quota, or None if it
+        is unknown.
+
+    """
+
+    def __init__(self, estimates, probes, seconds, remaining):
+
+        self.estimates = estimates
+        self.probes = probes
+        self.calls = sum(e.calls for e in estimates)
+        self.pages = sum(e.pages for e in estimates)
+        self.cached = sum(e.cached for e in estimates)
+        self.seconds = seconds
+        self.remaining = remaining
+
+    @property
+    def within_quota(self):
+        """ Whether the jobs can run within the remaining quota."""
+
+        return self.remaining is None or self.calls <= self.remaining
+
+    def raise_for_quota(self, max_calls=None):
+        """ Raises RuntimeError if the jobs are too expensive to run.
+
+        Parameters
+        ----------
+        max_calls: int (optional)
+            The maximum number of calls the caller is prepared to spend.
+
+        """
+
+        if not self.within_quota:
+            msg = "Plan requires %s calls but only %s remain." % (
+                self.calls, self.remaining)
+            raise RuntimeError(msg)
+        if max_calls is not None and self.calls > max_calls:
+            msg = "Plan requires %s calls, which exceeds the limit of %s." % (
+                self.calls, max_calls)
+            raise RuntimeError(msg)
+
+    def __repr__(self):
+        return '<Plan [calls=%s, pages=%s, seconds=%.1f]>' % (
+            self.calls, self.pages, self.seconds)
+
+
+class Planner(object):
+    """ Estimates the cost of searches and bulk fetches without running them.
+
+    Examples
+    --------
+    planner = Planner(engine)
+    planner.add_search('companies', q='bp', per_page=100)
+    planner.add_fetch_many('companies', [('gb', '00102498')])
+    plan = planner.plan()
+    plan.raise_for_quota(max_calls=1000)
+
+    Parameters
+    ----------
+    engine: obj
+        The engine the jobs will be run with.
+    latency: float (optional)
+        The expected seconds per call, used to estimate the runtime of
+        concurrent calls when no rate limit is configured.
+
+    """
+
+    def __init__(self, engine, latency=DEFAULT_LATENCY):
+
+        self.engine = engine
+        self.latency = latency
+        self.jobs = []
+
+    def add_search(self, object_type, *args, **kwargs):
+        """ Adds a search job to the plan.
+
+        The search's arguments are the same as those of the engine's search
+        method.
+
+        """
+
+        if kwargs.get('q') is None:
+            msg = "Please provide a value for q as a keyword argument."
+            raise ValueError(msg)
+
+        self.jobs.append({'action': 'search', 'object_type': object_type,
+                          'args': args, 'kwargs': kwargs})
+        return self
+
+    def add_searches(self, object_type, queries, **kwargs):
+        """ Adds a search job to the plan for each query in queries."""
+
+        for q in queries:
+            self.add_search(object_type, q=q, **kwargs)
+        return self
+
+    def add_fetch_many(self, fetch_type, identifiers):
+        """ Adds a bulk fetch job to the plan.
+
+        The job's arguments are the same as those of the engine's
+        fetch_many method.
+
+        """
+
+        identifiers = [i if isinstance(i, (list, tuple)) else (i,)
+                       for i in identifiers]
+        self.jobs.append({'action': 'fetch', 'object_type': fetch_type,
+                          'identifiers': identifiers})
+        return self
+
+    def plan(self, check_quota=True):
+        """ Probes each search and returns the Plan for all jobs.
+
+        Parameters
+        ----------
+        check_quota: bool (optional)
+            Whether to refresh the engine's quota from account_status.
+            Defaults to True.
+
+        """
+
+        estimates = [None] * len(self.jobs)
+        searches = [(n, job) for n, job in enumerate(self.jobs)
+                    if job['action'] == 'search']
+
+        # probe each distinct query only once
+        probes = {}
+        for n, job in searches:
+            probes.setdefault(self._probe_key(job), []).append(n)
+
+        pool = ThreadPoolExecutor(max_workers=self.engine.max_workers)
+        try:
+            counts = pool.map(self._count, [self.jobs[ns[0]]
+                                            for ns in probes.values()])
+            for ns, count in zip(probes.values(), counts):
+                for n in ns:
+                    estimates[n] = self._estimate_search(self.jobs[n], count)
+        finally:
+            pool.shutdown(wait=True)
+
+        for n, job in enumerate(self.jobs):
+            if job['action'] == 'fetch':
+                estimates[n] = self._estimate_fetch(job)
+
+        calls = sum(e.calls for e in estimates)
+        remaining = self.engine.refresh_quotas() if check_quota \
+            else self.engine.tokens.remaining
+
+        return Plan(estimates, len(probes), self._seconds(calls), remaining)
+
+    def _probe_key(self, job):
+        kwargs = dict(job['kwargs'])
+        kwargs.pop('per_page', None)
+        kwargs['q'] = str(kwargs['q']).lower().replace(' ', '+')
+        request_vars = tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+        return job['object_type'], tuple(job['args']), request_vars
+
+    def _count(self, job):
+        """ Returns the total_count of a search with a one-item probe."""
+
+        kwargs = dict(job['kwargs'])
+        kwargs['per_page'] = 1
+        search = self.engine.search(job['object_type'], *job['args'], **kwargs)
+        return search.total_count or 0
+
+    def _estimate_search(self, job, count):
+        per_page = int(job['kwargs'].get('per_page') or DEFAULT_PER_PAGE)
+        pages = int(math.ceil(count / float(per_page)))
+        # a SearchRequest requests its first page when it is created, and
+        # its results reuse that response
+        calls = max(pages, 1)
+        return Estimate(job, count, pages, calls, 0)
+
+    def _estimate_fetch(self, job):
+        cached = 0
+        for identifier in job['identifiers']:
+            if self.engine.cached(job['object_type'], *identifier):
+                cached += 1
+        count = len(job['identifiers'])
+        return Estimate(job, count, 0, count - cached, cached)
+
+    def _seconds(self, calls):
+        """ Returns the estimated runtime of calls under the rate limits."""
+
+        seconds = calls * self.latency / float(self.engine.max_workers)
+        rate_limit = self.engine.tokens.rate_limit
+        if rate_limit:
+            available = len([s for s in self.engine.tokens.tokens.values()
+                             if not s.exhausted]) or 1
+            seconds = max(seconds, calls / float(rate_limit * available))
+        return seconds
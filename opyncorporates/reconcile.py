@@ -0,0 +1,203 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import difflib
+import threading
+
+import requests
+
+from opyncorporates.scheduling import bind
+from opyncorporates.store import normalize
+
+"""Bulk reconciliation of company names.
+
+A :class:`Reconciler` maps a list of company names onto OpenCorporates
+companies. Each name is normalized (case, accents, punctuation and legal
+suffixes such as 'Ltd' or 'GmbH' are removed), names that normalize to the
+same query share a single search, only the first page of candidates is
+requested, and candidates are scored locally.
+
+"""
+
+# legal form suffixes removed from the end of a normalized name
+LEGAL_SUFFIXES = frozenset([
+    'ab', 'ag', 'as', 'asa', 'bv', 'bvba', 'co', 'company', 'corp',
+    'corporation', 'cv', 'gmbh', 'inc', 'incorporated', 'kg', 'kk', 'lc',
+    'limited', 'llc', 'llp', 'lp', 'ltd', 'ltda', 'nv', 'oy', 'oyj', 'plc',
+    'pte', 'pty', 'sa', 'sarl', 'sas', 'sl', 'spa', 'srl',
+])
+
+
+def normalize_name(name):
+    """ Returns a company name normalized for searching and scoring.
+
+    Examples
+    --------
+    normalize_name('The Acme Widget Co., Ltd.') --> 'acme widget'
+    normalize_name('Acme & Sons GmbH') --> 'acme and sons'
+
+    """
+
+    name = normalize(u'%s' % name.replace('&', ' and ')) if name else ''
+    tokens = name.split()
+    if tokens and tokens[0] == 'the':
+        tokens = tokens[1:]
+    # keep at least one token, e.g. for a company named 'Company Ltd'
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def score(query, candidate):
+    """ Scores a candidate company against a normalized query from 0 to 1.
+
+    The score averages the character similarity and the token overlap of
+    the query and the candidate's normalized name, using the best of the
+    candidate's current and previous names.
+
+    Parameters
+    ----------
+    query: str
+        A name normalized with normalize_name.
+    candidate: dict
+        A company returned by the opencorporates API.
+
+    """
+
+    names = [candidate.get('name')]
+    for previous in candidate.get('previous_names') or []:
+        if isinstance(previous, dict):
+            names.append(previous.get('company_name'))
+
+    best = 0.0
+    query_tokens = set(query.split())
+    for name in names:
+        if not name:
+            continue
+        name = normalize_name(name)
+        tokens = set(name.split())
+        overlap = len(query_tokens & tokens) / float(
+            len(query_tokens | tokens) or 1)
+        ratio = difflib.SequenceMatcher(None, query, name).ratio()
+        best = max(best, (overlap + ratio) / 2.0)
+    return best
+
+
+class Reconciler(object):
+    """ Maps company names onto OpenCorporates companies.
+
+    Examples
+    --------
+    reconciler = Reconciler(engine, jurisdiction_code='gb')
+    for name, company, score in reconciler.reconcile(names):
+        ...
+
+    Parameters
+    ----------
+    engine: obj
+        The engine used to search for candidates.
+    jurisdiction_code: str (optional)
+        Restricts candidates to a jurisdiction.
+    per_page: int (optional)
+        The number of candidates requested for each query. Defaults to 30.
+    threshold: float (optional)
+        The minimum score of a match. Inputs whose best candidate scores
+        lower, or whose search fails, are returned with no match. Defaults
+        to 0.
+    max_workers: int (optional)
+        The maximum number of concurrent searches. Defaults to the engine's
+        max_workers.
+    cache_size: int (optional)
+        The number of recent queries whose matches are reused by later
+        duplicate names. Defaults to 10000.
+
+    Attributes
+    ----------
+    searches: int
+        The number of searches submitted.
+    errors: int
+        The number of searches that failed.
+
+    """
+
+    def __init__(self, engine, jurisdiction_code=None, per_page=30,
+                 threshold=0.0, max_workers=None, cache_size=10000):
+
+        self.engine = engine
+        self.jurisdiction_code = jurisdiction_code
+        self.per_page = per_page
+        self.threshold = threshold
+        self.max_workers = max_workers or engine.max_workers
+        self.cache_size = cache_size
+        self.searches = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def reconcile(self, names):
+        """ Yields (name, best_match, score) for each name, in input order.
+
+        best_match is a company dict, or None if no candidate reaches the
+        threshold or the search failed. Names are consumed lazily, and names
+        with the same normalized query share a single search while the query
+        is among the cache_size most recent queries.
+
+        """
+
+        match = bind(self.match, default='bulk')
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        # an LRU cache of searches, so that memory does not grow with the
+        # number of distinct names
+        queries = OrderedDict()
+        pending = deque()
+        try:
+            for name in names:
+                query = normalize_name(name)
+                future = queries.pop(query, None)
+                if future is None:
+                    future = pool.submit(match, query)
+                queries[query] = future
+                while len(queries) > self.cache_size:
+                    queries.popitem(last=False)
+                pending.append((name, future))
+                # keep a bounded window of searches in flight
+                while len(pending) >= 4 * self.max_workers:
+                    yield self._result(pending.popleft())
+            while pending:
+                yield self._result(pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def match(self, query):
+        """ Returns (best_match, score) for a normalized query."""
+
+        if not query:
+            return None, 0.0
+
+        kwargs = {'q': query, 'per_page': self.per_page}
+        if self.jurisdiction_code is not None:
+            kwargs['jurisdiction_code'] = self.jurisdiction_code
+        with self._lock:
+            self.searches += 1
+        try:
+            search = self.engine.search('companies', **kwargs)
+            # the search's own response holds the first page of candidates
+            candidates = search.results.page(1) if search.total_count else []
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            return None, 0.0
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            candidate_score = score(query, candidate)
+            if candidate_score > best_score:
+                best, best_score = candidate, candidate_score
+        if best is None or best_score < self.threshold:
+            return None, best_score
+        return best, best_score
+
+    def _result(self, entry):
+        name, future = entry
+        best, best_score = future.result()
+        return name, best, best_score
@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from opyncorporates import scheduling
+from opyncorporates.tokens import RateLimiter
+
+"""Stale-while-revalidate refreshes of hot entities.
+
+A :class:`Refresher` counts how often an engine reads each entity from its
+entity store. Once a hot entity's stored copy is older than a soft TTL, the
+copy is still served at once, and the entity is refetched by a background
+worker pool, so that it is fresh again before the store's max_age forces a
+blocking fetch. Refreshes run at background priority and are limited to a
+share of the engine's rate limit.
+
+"""
+
+
+class Refresher(object):
+    """ Refreshes hot entities in the background after a soft TTL.
+
+    Examples
+    --------
+    store = EntityStore('entities.db', max_age=24 * 3600)
+    refresher = Refresher(soft_ttl=3600, min_hits=3, share=0.2)
+    engine = create_engine(store=store, refresh=refresher, rate_limit=5)
+
+    Parameters
+    ----------
+    soft_ttl: float
+        The age in seconds after which a hot entity is refreshed. This
+        should be shorter than the store's max_age.
+    min_hits: int (optional)
+        The number of reads after which an entity is hot. Defaults to 2.
+    share: float (optional)
+        The share of the engine's rate limit available to refreshes.
+        Defaults to 0.1.
+    max_workers: int (optional)
+        The number of refreshes run at once. Defaults to 2.
+    max_keys: int (optional)
+        The number of entities whose reads are counted. When exceeded, all
+        counts are halved and entities without reads are forgotten, so
+        that counts favour recent reads. Defaults to 10000.
+
+    Attributes
+    ----------
+    limiter: obj
+        The RateLimiter of refreshes, or None if the engine has no rate
+        limit.
+    refreshed: int
+        The number of refreshes run.
+    skipped: int
+        The number of refreshes skipped because too many were waiting.
+
+    """
+
+    def __init__(self, soft_ttl, min_hits=2, share=0.1, max_workers=2,
+                 max_keys=10000):
+
+        if not 0 < share <= 1:
+            raise ValueError('Refresh share must be between 0 and 1.')
+
+        self.soft_ttl = soft_ttl
+        self.min_hits = min_hits
+        self.share = share
+        self.max_workers = max_workers
+        self.max_keys = max_keys
+        self.limiter = None
+        self.refreshed = 0
+        self.skipped = 0
+
+        self._hits = {}
+        self._pending = set()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+
+    def limit(self, rate):
+        """ Limits refreshes to the refresher's share of rate calls/second."""
+
+        self.limiter = RateLimiter(rate * self.share) if rate else None
+
+    def hits(self, key):
+        """ Returns the number of counted reads of key."""
+
+        with self._lock:
+            return self._hits.get(key, 0)
+
+    def access(self, key, fetched_at, refresh):
+        """ Counts a read of key, and refreshes it if it is hot and stale.
+
+        Parameters
+        ----------
+        key: str
+            The store key of the entity, e.g. 'companies/gb/00102498'.
+        fetched_at: float
+            The time the stored copy was fetched, or None if the entity is
+            not stored.
+        refresh: callable
+            The function called with key to refetch and store the entity.
+
+        Returns
+        -------
+        bool
+            True if a refresh of key was submitted.
+
+        """
+
+        with self._lock:
+            hits = self._hits.get(key, 0) + 1
+            self._hits[key] = hits
+            if len(self._hits) > self.max_keys:
+                self._decay()
+
+            if fetched_at is None or hits < self.min_hits or \
+                    time.time() - fetched_at <= self.soft_ttl or \
+                    key in self._pending:
+                return False
+            if len(self._pending) >= 4 * self.max_workers:
+                self.skipped += 1
+                return False
+            self._pending.add(key)
+
+        self._pool.submit(self._refresh, key, refresh)
+        return True
+
+    def close(self):
+        """ Waits for submitted refreshes and stops the worker pool."""
+
+        self._pool.shutdown(wait=True)
+
+    def _decay(self):
+        """ Halves every count and forgets unread keys. Requires the lock."""
+
+        for key, hits in list(self._hits.items()):
+            if hits > 1:
+                self._hits[key] = hits // 2
+            else:
+                del self._hits[key]
+
+    def _refresh(self, key, refresh):
+        try:
+            if self.limiter is not None:
+                self.limiter.wait()
+            with scheduling.priority('background', job='refresh'):
+                refresh(key)
+            with self._lock:
+                self.refreshed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
@@ -0,0 +1,241 @@
+from contextlib import contextmanager
+import heapq
+import itertools
+import threading
+
+"""Priority scheduling of requests.
+
+A :class:`Scheduler` decides which of an engine's waiting requests is
+submitted next. Requests belong to a priority class and to a job. Classes
+are served in strict priority order, each class may be capped to a number
+of concurrent requests, and the requests of a class are shared between its
+jobs by weighted fair queuing, so that one large job cannot starve the
+others.
+
+The class and job of a request are taken from the thread that submits it,
+and are set with the :func:`priority` context manager::
+
+    with priority('bulk', job='nightly-crawl'):
+        for item in engine.search('companies', q='bank').results:
+            ...
+
+Functions run on worker threads inherit the class and job of the thread
+that created them through :func:`bind`.
+
+"""
+
+PRIORITIES = ('interactive', 'bulk', 'background')
+
+DEFAULT_PRIORITY = 'interactive'
+
+_local = threading.local()
+
+
+def current():
+    """ Returns the (priority, job) of the current thread, or None."""
+
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def priority(name, job=None):
+    """ Sets the priority class and job of requests made in the block.
+
+    Parameters
+    ----------
+    name: str
+        The priority class, e.g. 'interactive', 'bulk' or 'background'.
+    job: str (optional)
+        The job the requests belong to. Defaults to the current thread's
+        name.
+
+    """
+
+    previous = current()
+    _local.context = (name, job or threading.current_thread().name)
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+@contextmanager
+def default_priority(name, job=None):
+    """ Sets the priority of requests made in the block, unless already set.
+
+    Bulk methods use this to run at a lower priority when the caller has
+    not chosen one.
+
+    """
+
+    if current() is not None:
+        yield
+        return
+    with priority(name, job):
+        yield
+
+
+def bind(fn, default=None):
+    """ Returns fn bound to the priority class and job of the current thread.
+
+    Use bind when submitting work to a thread pool, so that the requests
+    made by the work are scheduled like those of the submitting thread.
+
+    Parameters
+    ----------
+    fn: callable
+        The function to bind.
+    default: str (optional)
+        The priority class to bind if the current thread has none.
+
+    """
+
+    context = current()
+    if context is None and default is not None:
+        context = (default, threading.current_thread().name)
+
+    def run(*args, **kwargs):
+        previous = current()
+        _local.context = context
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.context = previous
+
+    return run
+
+
+class Scheduler(object):
+    """ Schedules requests by priority class and weighted fair queuing.
+
+    Examples
+    --------
+    scheduler = Scheduler(max_concurrent=8, caps={'bulk': 6})
+    scheduler.set_weight('nightly-crawl', 0.5)
+    with scheduler.slot('bulk', 'nightly-crawl'):
+        response = session.get(url)
+
+    Parameters
+    ----------
+    max_concurrent: int (optional)
+        The maximum number of requests in flight. Defaults to 8.
+    priorities: list (optional)
+        The priority classes, from highest to lowest priority. Defaults to
+        ('interactive', 'bulk', 'background').
+    caps: dict (optional)
+        The maximum number of requests in flight for each class. By
+        default, bulk requests are capped to three quarters and background
+        requests to a quarter of max_concurrent, which leaves room for
+        interactive requests while other classes are busy.
+
+    Attributes
+    ----------
+    running: dict
+        The number of requests in flight for each class.
+    waiting: int
+        The number of requests waiting for a slot.
+
+    """
+
+    def __init__(self, max_concurrent=8, priorities=PRIORITIES, caps=None):
+
+        if caps is None:
+            caps = {'bulk': max(max_concurrent * 3 // 4, 1),
+                    'background': max(max_concurrent // 4, 1)}
+
+        self.max_concurrent = max_concurrent
+        self.priorities = list(priorities)
+        self.caps = caps
+        self.running = dict((p, 0) for p in self.priorities)
+
+        self._weights = {}
+        self._finish = {}
+        self._virtual_time = {}
+        self._queues = dict((p, []) for p in self.priorities)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self):
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def set_weight(self, job, weight):
+        """ Sets a job's share of its class relative to other jobs.
+
+        Jobs have a weight of 1 unless set otherwise.
+
+        """
+
+        if weight <= 0:
+            raise ValueError('Job weight must be greater than zero.')
+        with self._lock:
+            self._weights[job] = float(weight)
+
+    def rank(self, priority=None):
+        """ Returns the rank of a priority class, where 0 is the highest."""
+
+        return self.priorities.index(priority or DEFAULT_PRIORITY)
+
+    @contextmanager
+    def slot(self, priority=None, job=None):
+        """ Waits for and holds a slot for a single request.
+
+        Parameters
+        ----------
+        priority: str (optional)
+            The request's priority class. Defaults to 'interactive'.
+        job: str (optional)
+            The job the request belongs to.
+
+        """
+
+        priority = priority or DEFAULT_PRIORITY
+        if priority not in self.running:
+            raise ValueError('`%s` is not a priority class.' % priority)
+
+        ready = threading.Event()
+        with self._lock:
+            # weighted fair queuing: tag each request with the virtual time
+            # at which it would finish if its job were served alone
+            virtual_time = self._virtual_time.get(priority, 0.0)
+            start = max(virtual_time, self._finish.get((priority, job), 0.0))
+            finish = start + 1.0 / self._weights.get(job, 1.0)
+            self._finish[(priority, job)] = finish
+            heapq.heappush(self._queues[priority],
+                           (finish, next(self._counter), start, ready))
+            self._dispatch()
+
+        ready.wait()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running[priority] -= 1
+                self._dispatch()
+
+    def _dispatch(self):
+        """ Wakes waiting requests while slots are free. Requires the lock."""
+
+        while sum(self.running.values()) < self.max_concurrent:
+            for priority in self.priorities:
+                queue = self._queues[priority]
+                cap = self.caps.get(priority)
+                if queue and (cap is None or self.running[priority] < cap):
+                    break
+            else:
+                return
+
+            finish, _, start, ready = heapq.heappop(queue)
+            # the virtual time of a class is the start tag of the request
+            # it most recently served
+            self._virtual_time[priority] = max(
+                self._virtual_time.get(priority, 0.0), start)
+            self.running[priority] += 1
+            ready.set()
+
+            if len(self._finish) > 1024:
+                # forget jobs that have no requests ahead of the class
+                for key, tag in list(self._finish.items()):
+                    if tag <= self._virtual_time.get(key[0], 0.0):
+                        del self._finish[key]
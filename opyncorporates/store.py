@@ -0,0 +1,291 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from opyncorporates.graph import node_key, parse_key
+
+"""A local SQLite store of fetched entities.
+
+An :class:`EntityStore` keeps the records returned by fetch requests,
+normalized by object type, so that repeated fetches of the same company or
+officer can be answered locally. Records are keyed by the same route keys
+used by :mod:`opyncorporates.graph` (e.g. ``companies/gb/00102498``), and
+companies and officers are indexed by jurisdiction code, company number and
+normalized name for offline queries.
+
+"""
+
+# the number of identifiers in the route of each cacheable fetch type
+ENTITY_TYPES = {
+    'companies': 2,
+    'officers': 1,
+    'corporate_groupings': 1,
+    'filings': 1,
+    'statements': 1,
+    'placeholders': 1,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    key TEXT PRIMARY KEY,
+    object_type TEXT NOT NULL,
+    results TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS companies (
+    key TEXT PRIMARY KEY,
+    jurisdiction_code TEXT,
+    company_number TEXT,
+    name TEXT,
+    normalized_name TEXT
+);
+CREATE INDEX IF NOT EXISTS companies_number
+    ON companies (company_number, jurisdiction_code);
+CREATE INDEX IF NOT EXISTS companies_jurisdiction
+    ON companies (jurisdiction_code);
+CREATE INDEX IF NOT EXISTS companies_name
+    ON companies (normalized_name);
+CREATE TABLE IF NOT EXISTS officers (
+    key TEXT PRIMARY KEY,
+    jurisdiction_code TEXT,
+    company_number TEXT,
+    name TEXT,
+    normalized_name TEXT
+);
+CREATE INDEX IF NOT EXISTS officers_company
+    ON officers (jurisdiction_code, company_number);
+CREATE INDEX IF NOT EXISTS officers_name
+    ON officers (normalized_name);
+"""
+
+
+def normalize(name):
+    """ Returns name lowercased, without accents, punctuation or extra spaces.
+
+    Examples
+    --------
+    normalize('Acme  Widgets, Ltd.') --> 'acme widgets ltd'
+
+    """
+
+    if name is None:
+        return None
+    name = unicodedata.normalize('NFKD', u'%s' % name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r"[.']", '', name.lower())
+    name = re.sub(r'[^\w]+', ' ', name, flags=re.UNICODE)
+    return ' '.join(name.split())
+
+
+def entity_key(url):
+    """ Returns the store key for a fetch url, or None if not cacheable.
+
+    Urls with request variables other than api_token are not cacheable,
+    since their responses may differ from those of a plain fetch.
+
+    Examples
+    --------
+    entity_key('https://api.opencorporates.com/v0.4/companies/gb/00102498')
+        --> 'companies/gb/00102498'
+
+    """
+
+    route = str(url)
+    if '://' in route:
+        route = route.split('://', 1)[1].partition('/')[2]
+    route, _, query = route.partition('?')
+    names = [v.split('=', 1)[0] for v in query.split('&') if v]
+    if [n for n in names if n != 'api_token'] or not route.strip('/'):
+        return None
+    object_type, args = parse_key(route)
+    if ENTITY_TYPES.get(object_type) != len(args):
+        return None
+    return node_key(object_type, *args)
+
+
+class EntityStore(object):
+    """ A local SQLite store of fetched entities.
+
+    Examples
+    --------
+    store = EntityStore('entities.db', max_age=7 * 24 * 3600)
+    engine = create_engine(store=store)
+    engine.fetch('companies', 'gb', '00102498')  # calls the API
+    engine.fetch('companies', 'gb', '00102498')  # served by the store
+    store.find_companies(name='bp', jurisdiction_code='gb')
+
+    Parameters
+    ----------
+    path: str (optional)
+        The path of the SQLite database. Defaults to an in-memory database.
+    max_age: float (optional)
+        The number of seconds after which a record is stale and must be
+        fetched again. By default, records never go stale.
+
+    """
+
+    def __init__(self, path=':memory:', max_age=None):
+
+        self.path = path
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def __contains__(self, key):
+        return self.fetched_at(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            row = self._conn.execute('SELECT COUNT(*) FROM entities')
+            return row.fetchone()[0]
+
+    def close(self):
+        """ Closes the store's database connection."""
+
+        with self._lock:
+            self._conn.close()
+
+    def fetched_at(self, key):
+        """ Returns the time key was stored, or None if it is not stored."""
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fetched_at FROM entities WHERE key = ?', (key,))
+            row = row.fetchone()
+        return row[0] if row else None
+
+    def fresh(self, key, max_age=None):
+        """ Returns True if key is stored and is not stale."""
+
+        fetched_at = self.fetched_at(key)
+        if fetched_at is None:
+            return False
+        max_age = self.max_age if max_age is None else max_age
+        return max_age is None or time.time() - fetched_at <= max_age
+
+    def get_results(self, key):
+        """ Returns the stored results dict for key, e.g. {'company': {...}}.
+
+        Returns None if key is not stored.
+
+        """
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT results FROM entities WHERE key = ?', (key,))
+            row = row.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, key):
+        """ Returns the stored record for key, or None if it is not stored."""
+
+        results = self.get_results(key)
+        if not results:
+            return None
+        return list(results.values())[0]
+
+    def put(self, key, results, fetched_at=None):
+        """ Stores the results of a fetch request under key.
+
+        Parameters
+        ----------
+        key: str
+            The store key, e.g. 'companies/gb/00102498'.
+        results: dict
+            The results dict of the response, e.g. {'company': {...}}.
+        fetched_at: float (optional)
+            The time the results were fetched. Defaults to now.
+
+        """
+
+        object_type = parse_key(key)[0]
+        record = list(results.values())[0] if results else None
+        if not isinstance(record, dict):
+            return
+        fetched_at = time.time() if fetched_at is None else fetched_at
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)',
+                (key, object_type, json.dumps(results), fetched_at))
+            if object_type == 'companies':
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?)',
+                    (key, record.get('jurisdiction_code'),
+                     record.get('company_number'), record.get('name'),
+                     normalize(record.get('name'))))
+            elif object_type == 'officers':
+                company = record.get('company') or {}
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO officers VALUES (?, ?, ?, ?, ?)',
+                    (key, company.get('jurisdiction_code'),
+                     company.get('company_number'), record.get('name'),
+                     normalize(record.get('name'))))
+
+    def find_companies(self, name=None, jurisdiction_code=None,
+                       company_number=None, limit=None):
+        """ Returns stored companies matching the given fields.
+
+        Parameters
+        ----------
+        name: str (optional)
+            A name prefix, matched against normalized company names.
+        jurisdiction_code: str (optional)
+            The company's jurisdiction code.
+        company_number: str (optional)
+            The company's number.
+        limit: int (optional)
+            The maximum number of companies to return.
+
+        Returns
+        -------
+        list
+            A list of company dicts.
+
+        """
+
+        return self._find('companies', name, jurisdiction_code,
+                          company_number, limit)
+
+    def find_officers(self, name=None, jurisdiction_code=None,
+                      company_number=None, limit=None):
+        """ Returns stored officers matching the given fields.
+
+        The jurisdiction_code and company_number refer to the officer's
+        company. See find_companies for a description of the parameters.
+
+        """
+
+        return self._find('officers', name, jurisdiction_code,
+                          company_number, limit)
+
+    def _find(self, table, name, jurisdiction_code, company_number, limit):
+
+        clauses, params = [], []
+        if name is not None:
+            # a range on the indexed column matches the prefix
+            prefix = normalize(name)
+            clauses.append('t.normalized_name >= ? AND t.normalized_name < ?')
+            params.extend([prefix, prefix + u'\uffff'])
+        if jurisdiction_code is not None:
+            clauses.append('t.jurisdiction_code = ?')
+            params.append(jurisdiction_code)
+        if company_number is not None:
+            clauses.append('t.company_number = ?')
+            params.append(company_number)
+
+        sql = 'SELECT e.results FROM %s t JOIN entities e ON e.key = t.key' \
+              % table
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if limit is not None:
+            sql += ' LIMIT %d' % int(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [list(json.loads(row[0]).values())[0] for row in rows]
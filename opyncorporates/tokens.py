@@ -0,0 +1,409 @@
+import re
+import threading
+import time
+
+"""API token pools and per-token rate limiting.
+
+The opencorporates API limits the number of calls each API token can make
+per second, per day and per month. A :class:`TokenPool` holds one or more
+tokens, tracks each token's remaining quota and spreads requests across the
+tokens with the most capacity, so that aggregate throughput scales with the
+number of tokens in the pool.
+
+"""
+
+# response headers that report a token's remaining calls
+REMAINING_HEADERS = (
+    'X-RateLimit-Remaining',
+    'X-Ratelimit-Remaining-Day',
+    'RateLimit-Remaining',
+)
+
+# response headers that report when a token's calls are reset, in seconds
+# from now or as a unix time
+RESET_HEADERS = (
+    'X-RateLimit-Reset',
+    'RateLimit-Reset',
+)
+
+# seconds a token is taken out of rotation when throttled or exhausted
+# without a Retry-After or reset header
+DEFAULT_BACKOFF = 60.0
+
+# returned by TokenPool._take when no token is available, since None is a
+# valid (anonymous) token
+_NONE = object()
+
+
+def with_token(url, api_token):
+    """ Returns url with its api_token request variable set to api_token."""
+
+    url = re.sub(r'([?&])api_token=[^&]*&?', r'\1', url).rstrip('?&')
+    if api_token is None:
+        return url
+    separator = '&' if '?' in url else '?'
+    return '%s%sapi_token=%s' % (url, separator, api_token)
+
+
+def _backoff(response=None):
+    """ Returns the seconds until a throttled or exhausted token is reset.
+
+    Uses the response's Retry-After or reset header if it has one.
+
+    """
+
+    headers = response.headers if response is not None else {}
+    for header in ('Retry-After',) + RESET_HEADERS:
+        try:
+            value = float(headers.get(header))
+        except (TypeError, ValueError):
+            continue
+        # reset headers may hold a unix time rather than a delay
+        if value > 1e9:
+            value -= time.time()
+        return max(value, 0.0)
+    return DEFAULT_BACKOFF
+
+
+class RateLimiter(object):
+    """ A token bucket limiting calls to a number per second.
+
+    Parameters
+    ----------
+    rate: float
+        The sustained number of calls allowed per second.
+    burst: int (optional)
+        The number of calls that may be made at once. Defaults to 1.
+
+    """
+
+    def __init__(self, rate, burst=1):
+
+        if rate <= 0:
+            raise ValueError('Rate limit must be greater than zero.')
+
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._allowance = float(self.burst)
+        self._checked_at = time.time()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """ Returns the number of seconds until a call is allowed."""
+
+        with self._lock:
+            self._refill()
+            if self._allowance >= 1:
+                return 0.0
+            return (1 - self._allowance) / self.rate
+
+    def consume(self):
+        """ Consumes one call, returning False if none are available."""
+
+        with self._lock:
+            self._refill()
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            return True
+
+    def wait(self):
+        """ Blocks until a call is allowed and consumes it."""
+
+        while not self.consume():
+            time.sleep(self.delay())
+
+    def _refill(self):
+        now = time.time()
+        elapsed = now - self._checked_at
+        self._checked_at = now
+        self._allowance = min(self.burst,
+                              self._allowance + elapsed * self.rate)
+
+
+class TokenState(object):
+    """ Quota and throttling state for a single API token.
+
+    Attributes
+    ----------
+    api_token: str
+        The API token, or None for anonymous requests.
+    remaining: int
+        The estimated number of calls remaining, or None if unknown.
+    throttled_until: float
+        The time before which the token is out of rotation.
+    exhausted: bool
+        Whether the token has used up its quota.
+    reset_at: float
+        The time at which an exhausted token is put back into rotation and
+        its quota is re-checked.
+    recheck: bool
+        Whether the token's quota should be re-checked, e.g. from its
+        account status, before it is used.
+    in_flight: int
+        The number of requests currently using the token.
+    calls: int
+        The number of requests submitted with the token.
+
+    """
+
+    def __init__(self, api_token, rate_limit=None):
+
+        self.api_token = api_token
+        self.remaining = None
+        self.throttled_until = 0.0
+        self.exhausted = False
+        self.reset_at = 0.0
+        self.recheck = False
+        self.in_flight = 0
+        self.calls = 0
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    @property
+    def capacity(self):
+        """ The estimated number of calls available to new requests.
+
+        remaining already excludes the calls in flight, since it is
+        decremented when a call acquires the token.
+
+        """
+
+        if self.remaining is None:
+            return float('inf')
+        return self.remaining
+
+    def delay(self, now):
+        """ Returns the seconds until the token can be used, or None.
+
+        An exhausted token whose reset time has passed is put back into
+        rotation and marked for a quota re-check.
+
+        """
+
+        if self.exhausted:
+            if now < self.reset_at:
+                return None
+            # the quota may have been reset: put the token back into
+            # rotation until its quota is known again
+            self.exhausted = False
+            self.remaining = None
+            self.recheck = True
+        delay = max(self.throttled_until - now, 0.0)
+        if self.limiter is not None:
+            delay = max(delay, self.limiter.delay())
+        return delay
+
+
+class TokenPool(object):
+    """ Spreads requests across a pool of API tokens.
+
+    Each request acquires the available token with the most remaining
+    capacity. The pool updates each token's quota from the response headers
+    and from the account_status fetch type, and takes a token out of
+    rotation when it is throttled (until its Retry-After time has passed)
+    or exhausted (until its quota is reset or refreshed).
+
+    A pool of a single token never runs out: its token is returned even
+    while exhausted, so that the API's own response reaches the caller.
+
+    Examples
+    --------
+    pool = TokenPool(['token-1', 'token-2'], rate_limit=2)
+    api_token = pool.acquire()
+    response = requests.get(with_token(url, api_token))
+    pool.release(api_token, response)
+
+    Parameters
+    ----------
+    api_tokens: list
+        The API tokens in the pool. None may be used for anonymous requests.
+    rate_limit: float (optional)
+        The maximum number of calls per second for each token.
+
+    Attributes
+    ----------
+    tokens: dict
+        A dict of TokenState objects keyed by API token.
+
+    """
+
+    def __init__(self, api_tokens, rate_limit=None):
+
+        api_tokens = list(api_tokens)
+        if len(api_tokens) == 0:
+            raise ValueError('Provide at least one API token for the pool.')
+
+        self.rate_limit = rate_limit
+        self.tokens = dict()
+        for api_token in api_tokens:
+            self.tokens[api_token] = TokenState(api_token, rate_limit)
+
+        self._waiting = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def remaining(self):
+        """ The total estimated calls remaining, or None if unknown."""
+
+        total = 0
+        for state in self.tokens.values():
+            if state.exhausted:
+                continue
+            if state.remaining is None:
+                return None
+            total += state.remaining
+        return total
+
+    def acquire(self, exclude=(), rank=0):
+        """ Returns the token with the most capacity, waiting if necessary.
+
+        Parameters
+        ----------
+        exclude: list (optional)
+            Tokens that should not be returned.
+        rank: int (optional)
+            The urgency of the request, where 0 is the most urgent. While a
+            more urgent request is waiting for a token, less urgent
+            requests keep waiting. Defaults to 0.
+
+        Raises
+        ------
+        RuntimeError
+            If every token in a pool of several tokens is exhausted or
+            excluded.
+
+        """
+
+        with self._lock:
+            self._waiting.append(rank)
+        try:
+            while True:
+                with self._lock:
+                    api_token, wait = self._take(exclude, rank)
+                    if api_token is not _NONE:
+                        return api_token
+                time.sleep(wait or 0.001)
+        finally:
+            with self._lock:
+                self._waiting.remove(rank)
+
+    def _take(self, exclude, rank):
+        """ Takes a ready token, or returns the seconds to wait for one.
+
+        Requires the lock.
+
+        """
+
+        now = time.time()
+        ready, wait = [], None
+        for state in self.tokens.values():
+            if state.api_token in exclude:
+                continue
+            delay = state.delay(now)
+            if delay is None:
+                continue
+            if delay == 0:
+                ready.append(state)
+            elif wait is None or delay < wait:
+                wait = delay
+
+        if not ready and wait is None:
+            if len(self.tokens) > 1 or exclude:
+                raise RuntimeError('All API tokens are exhausted.')
+            # a single token is used anyway, and the API's response tells
+            # the caller why it failed
+            ready = list(self.tokens.values())
+        if min(self._waiting) < rank:
+            # leave ready tokens to more urgent requests
+            return _NONE, None
+
+        ready.sort(key=lambda s: (-s.capacity, s.in_flight, s.calls))
+        for state in ready:
+            if state.limiter is None or state.limiter.consume():
+                state.in_flight += 1
+                state.calls += 1
+                if state.remaining is not None:
+                    state.remaining = max(state.remaining - 1, 0)
+                return state.api_token, None
+        return _NONE, wait
+
+    def release(self, api_token, response=None):
+        """ Releases a token and updates its state from response.
+
+        Returns
+        -------
+        bool
+            True if the response shows the token was throttled or
+            exhausted, in which case the request may be retried with
+            another token.
+
+        """
+
+        with self._lock:
+            state = self.tokens[api_token]
+            state.in_flight = max(state.in_flight - 1, 0)
+            if response is None:
+                return False
+
+            for header in REMAINING_HEADERS:
+                value = response.headers.get(header)
+                if value is not None and str(value).isdigit():
+                    state.remaining = int(value)
+                    if state.remaining <= 0:
+                        self._exhaust(state, response)
+                    break
+
+            if response.status_code == 429:
+                state.throttled_until = time.time() + _backoff(response)
+                return True
+
+            if response.status_code in (401, 403) and \
+                    'limit' in response.text.lower():
+                state.remaining = 0
+                self._exhaust(state, response)
+                return True
+
+            return False
+
+    def recheck(self, api_token):
+        """ Returns True once if a token's quota should be re-checked."""
+
+        with self._lock:
+            state = self.tokens[api_token]
+            recheck, state.recheck = state.recheck, False
+            return recheck
+
+    @staticmethod
+    def _exhaust(state, response=None):
+        """ Takes a token out of rotation until its reset time."""
+
+        state.exhausted = True
+        state.reset_at = time.time() + _backoff(response)
+
+    def update(self, api_token, account_status):
+        """ Updates a token's quota from an account_status result.
+
+        Parameters
+        ----------
+        api_token: str
+            The token the account status was fetched with.
+        account_status: dict
+            The results of an account_status fetch request.
+
+        """
+
+        calls_remaining = (account_status or {}).get('calls_remaining') or {}
+        values = [v for v in calls_remaining.values() if v is not None]
+        if not values:
+            return
+
+        with self._lock:
+            state = self.tokens[api_token]
+            state.remaining = min(int(v) for v in values)
+            state.exhausted = False
+            state.throttled_until = 0.0
+            if state.remaining <= 0:
+                self._exhaust(state)
@@ -14,8 +14,12 @@ setup(
     author_email='pjryan126@gmail.com',
     license='MIT',
     install_requires=[
-        'requests'
+        'requests',
+        'futures; python_version < "3"',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     packages=[
         'opyncorporates',
     ],
@@ -1,6 +1,9 @@
 import os
+import time
 from unittest import main, TestCase
 
+from opyncorporates.api import build_response
+
 
 class BaseTestCase(TestCase):
 
@@ -13,5 +16,42 @@ class BaseTestCase(TestCase):
         self.api_version = None
 
 
+class Session(object):
+    """ A fake requests session that records the url of each call.
+
+    Parameters
+    ----------
+    status_code: int (optional)
+        The status code of every response. Defaults to 200.
+    data: obj (optional)
+        The JSON body of every response.
+    headers: dict (optional)
+        The headers of every response.
+    respond: callable (optional)
+        Called with the url of each call to return its response, instead.
+    delay: float (optional)
+        The seconds each call takes. Defaults to 0.
+
+    """
+
+    def __init__(self, status_code=200, data=None, headers=None,
+                 respond=None, delay=0):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers
+        self.respond = respond
+        self.delay = delay
+        self.calls = []
+
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.respond is not None:
+            return self.respond(url)
+        return build_response(self.status_code, self.data, self.headers,
+                              url=url)
+
+
 if __name__ == '__main__':
     main()
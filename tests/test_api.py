@@ -101,6 +101,25 @@ class TestSearchRequest(BaseTestCase):
         page_results = self.search.get_page(1)
         self.assertEqual(len(page_results), 30)
 
+    def test_results_view(self):
+        """ Test SearchResults indexing and slicing."""
+        results = self.search.results
+        self.assertEqual(len(results), self.search.total_count)
+        page_results = self.search.get_page(2)
+        self.assertEqual(results[30], page_results[0])
+        self.assertEqual(results[25:35][5], page_results[0])
+        self.assertEqual(results[-1], list(results)[-1])
+        self.assertRaises(IndexError, results.__getitem__, len(results))
+
+    def test_results_batches(self):
+        """ Test column-oriented batches of search results."""
+        batches = list(self.search.results.batches(
+            40, fields=['name', 'registered_address.country']))
+        self.assertEqual(sum(len(b['name']) for b in batches),
+                         self.search.total_count)
+        self.assertEqual(len(batches[0]['registered_address.country']), 40)
+        self.assertEqual(batches[0]['name'][30], self.search.results[30]['name'])
+
 
 if __name__ == '__main__':
     main()
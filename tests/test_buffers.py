@@ -0,0 +1,49 @@
+from unittest import main
+
+from opyncorporates.buffers import SpillBuffer
+from tests.base import BaseTestCase
+
+
+class TestSpillBuffer(BaseTestCase):
+
+    def setUp(self):
+        super(TestSpillBuffer, self).setUp()
+        self.items = [{'name': 'COMPANY %s' % n, 'number': n}
+                      for n in range(100)]
+        self.buffer = SpillBuffer(memory_limit=500).extend(self.items)
+
+    def tearDown(self):
+        super(TestSpillBuffer, self).tearDown()
+        self.buffer.close()
+        self.buffer = None
+
+    def test_spill(self):
+        self.assertEqual(len(self.buffer), 100)
+        self.assertTrue(0 < self.buffer.spilled < 100)
+        self.assertTrue(self.buffer.memory_size <= 500)
+
+    def test_iterate(self):
+        self.assertEqual(list(self.buffer), self.items)
+        self.assertEqual(list(self.buffer), self.items)
+
+    def test_random_access(self):
+        self.assertEqual(self.buffer[0], self.items[0])
+        self.assertEqual(self.buffer[99], self.items[99])
+        self.assertEqual(self.buffer[-2], self.items[98])
+        self.assertEqual(self.buffer[40:45], self.items[40:45])
+        self.assertRaises(IndexError, self.buffer.__getitem__, 100)
+
+    def test_append_after_read(self):
+        self.assertEqual(self.buffer[99], self.items[99])
+        self.buffer.append({'name': 'LAST'})
+        self.assertEqual(self.buffer[100], {'name': 'LAST'})
+
+    def test_close(self):
+        f = self.buffer._file
+        self.buffer.close()
+        self.assertTrue(f.closed)
+        self.assertEqual(len(self.buffer), 0)
+
+
+if __name__ == '__main__':
+    main()
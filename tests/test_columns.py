@@ -0,0 +1,81 @@
+from unittest import main, skipIf
+from array import array
+import math
+
+from opyncorporates.columns import (ColumnBuilder, INT_TYPECODE, lookup,
+                                    numpy, parse_fields)
+from tests.base import BaseTestCase
+
+ITEMS = [
+    {'name': 'ACME LTD', 'employees': 10, 'active': True,
+     'registered_address': {'country': 'United Kingdom'},
+     'previous_names': [{'company_name': 'ACME WIDGETS LTD'}]},
+    {'name': 'BETA LTD', 'employees': None, 'active': False,
+     'registered_address': None, 'previous_names': []},
+]
+
+
+class TestColumns(BaseTestCase):
+
+    def test_parse_fields(self):
+        fields = parse_fields(['name', 'previous_names.0.company_name'])
+        self.assertEqual(fields[1].path, ('previous_names', 0, 'company_name'))
+        fields = parse_fields({'staff': ('employees', int)})
+        self.assertEqual(fields[0], ('staff', ('employees',), int))
+
+    def test_lookup(self):
+        self.assertEqual(lookup(ITEMS[0], ('registered_address', 'country')),
+                         'United Kingdom')
+        self.assertEqual(lookup(ITEMS[1], ('registered_address', 'country')),
+                         None)
+        self.assertEqual(lookup(ITEMS[1], ('previous_names', 0)), None)
+
+    def test_lists(self):
+        builder = ColumnBuilder(['name', 'registered_address.country',
+                                 'previous_names.0.company_name'])
+        builder.extend(ITEMS[:1]).extend(ITEMS[1:])
+        self.assertEqual(len(builder), 2)
+        columns = builder.build()
+        self.assertEqual(list(columns), ['name', 'registered_address.country',
+                                         'previous_names.0.company_name'])
+        self.assertEqual(columns['registered_address.country'],
+                         ['United Kingdom', None])
+        self.assertEqual(len(builder), 0)
+
+    def test_default_fields(self):
+        columns = ColumnBuilder().extend(ITEMS).build()
+        self.assertEqual(list(columns), list(ITEMS[0]))
+
+    def test_arrays(self):
+        builder = ColumnBuilder({'active': ('active', bool),
+                                 'staff': ('employees', float),
+                                 'count': ('employees', int)},
+                                format='array')
+        columns = builder.extend(ITEMS).build()
+        self.assertEqual(columns['active'], array('b', [1, 0]))
+        self.assertEqual(columns['staff'][0], 10.0)
+        self.assertTrue(math.isnan(columns['staff'][1]))
+        self.assertEqual(columns['count'], [10, None])
+
+        # values are converted to the field's type
+        builder = ColumnBuilder({'count': ('employees', int),
+                                 'staff': ('employees', float)},
+                                format='array')
+        columns = builder.extend([{'employees': '10'}]).build()
+        self.assertEqual(columns['count'], array(INT_TYPECODE, [10]))
+        self.assertEqual(columns['staff'], array('d', [10.0]))
+
+    @skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        builder = ColumnBuilder({'name': 'name', 'staff': ('employees', int)},
+                                format='numpy')
+        columns = builder.extend(ITEMS).build()
+        self.assertEqual(columns['name'].dtype, object)
+        self.assertTrue(numpy.isnan(columns['staff'][1]))
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, ColumnBuilder, format='csv')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from unittest import main
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.dumps import DumpIndex
+from opyncorporates.store import EntityStore
+from tests.base import BaseTestCase, Session
+
+
+class TestDumpIndex(BaseTestCase):
+
+    def setUp(self):
+        super(TestDumpIndex, self).setUp()
+        self.dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.dir, 'companies.csv')
+        with io.open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write(u'company_number,jurisdiction_code,name,'
+                    u'registered_address.locality\n')
+            f.write(u'00102498,gb,"BP P.L.C.",London\n')
+            f.write(u'00000001,gb,"ACME, ""WIDGETS"" LTD",\n')
+            f.write(u'00000002,gb,"SOCIÉTÉ GÉNÉRALE",Zürich\n')
+        self.jsonl_path = os.path.join(self.dir, 'companies.jsonl')
+        with open(self.jsonl_path, 'w') as f:
+            f.write(json.dumps({'company': {'company_number': '1',
+                                            'jurisdiction_code': 'us_de',
+                                            'name': 'ACME INC'}}) + '\n')
+
+    def tearDown(self):
+        super(TestDumpIndex, self).tearDown()
+        shutil.rmtree(self.dir)
+        self.dir = None
+
+    def test_csv(self):
+        dump = DumpIndex(self.csv_path, dumped_at=time.time())
+        self.assertFalse(dump.built)
+        self.assertEqual(dump.build(max_workers=2, chunk_size=16), 3)
+        self.assertTrue(dump.built)
+        company = dump.get('companies/gb/00102498')
+        self.assertEqual(company['name'], 'BP P.L.C.')
+        self.assertEqual(company['registered_address'], {'locality': 'London'})
+        self.assertEqual(dump.get('companies/gb/00000001')['name'],
+                         'ACME, "WIDGETS" LTD')
+        company = dump.get('companies/gb/00000002')
+        self.assertEqual(company['name'], u'SOCIÉTÉ GÉNÉRALE')
+        self.assertEqual(company['registered_address'],
+                         {'locality': u'Zürich'})
+        self.assertFalse('companies/gb/2' in dump)
+        dump.close()
+
+    def test_dumped_at(self):
+        dump = DumpIndex(self.csv_path)
+        self.assertIsNone(dump.dumped_at)
+        self.assertRaises(ValueError, dump.build)
+        dump.close()
+
+        # the time of the dump is kept in the index
+        dump = DumpIndex(self.csv_path, dumped_at=1546300800)
+        dump.build()
+        dump.close()
+        dump = DumpIndex(self.csv_path)
+        self.assertEqual(dump.dumped_at, 1546300800)
+        self.assertTrue(dump.built)
+        dump.close()
+
+    def test_rewritten_file(self):
+        dump = DumpIndex(self.csv_path, dumped_at=time.time())
+        dump.build()
+        dump.close()
+
+        # a file rewritten with the same size is no longer indexed
+        with open(self.csv_path, 'rb') as f:
+            data = f.read()
+        with open(self.csv_path, 'wb') as f:
+            f.write(data.replace(b'00102498', b'00102499'))
+        stat = os.stat(self.csv_path)
+        os.utime(self.csv_path, (stat.st_atime, stat.st_mtime + 10))
+        dump = DumpIndex(self.csv_path)
+        self.assertFalse(dump.built)
+        dump.build()
+        self.assertTrue('companies/gb/00102499' in dump)
+        dump.close()
+
+    def test_jsonl(self):
+        dump = DumpIndex(self.jsonl_path, dumped_at=time.time())
+        dump.build()
+        self.assertEqual(dump.get('companies/us_de/1')['name'], 'ACME INC')
+        dump.close()
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, DumpIndex,
+                          os.path.join(self.dir, 'companies.csv.gz'))
+
+    def test_fetch_from_dump(self):
+        dump = DumpIndex(self.csv_path, dumped_at=time.time())
+        dump.build()
+        dump.close()
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token, dump=self.csv_path)
+        self.assertTrue(engine.cached('companies', 'gb', '00102498'))
+        fetch = engine.fetch('companies', 'gb', '00102498')
+        self.assertEqual(fetch.results['name'], 'BP P.L.C.')
+        self.assertTrue(fetch.response.from_dump)
+        engine.dump.close()
+
+    def test_fetch_with_store_and_dump(self):
+        key = 'companies/gb/00102498'
+        dump = DumpIndex(self.csv_path, dumped_at=time.time() - 3600)
+        dump.build()
+        store = EntityStore(max_age=60)
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token, store=store,
+                               dump=dump)
+        engine.session = Session(data={'results': {'company': {
+            'name': 'API NAME'}}})
+
+        # a stale copy older than the dump is served from the dump
+        store.put(key, {'company': {'name': 'OLDER STORED NAME'}},
+                  fetched_at=time.time() - 7200)
+        fetch = engine.fetch('companies', 'gb', '00102498')
+        self.assertEqual(fetch.results['name'], 'BP P.L.C.')
+        self.assertEqual(engine.session.calls, [])
+
+        # a stale copy newer than the dump is refetched from the API
+        store.put(key, {'company': {'name': 'NEWER STORED NAME'}},
+                  fetched_at=time.time() - 120)
+        self.assertFalse(engine.cached('companies', 'gb', '00102498'))
+        fetch = engine.fetch('companies', 'gb', '00102498')
+        self.assertEqual(fetch.results['name'], 'API NAME')
+        self.assertEqual(len(engine.session.calls), 1)
+        self.assertEqual(store.get(key)['name'], 'API NAME')
+        dump.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,15 @@ class TestEngineV04(BaseTestCase):
     def test_search_with_missing_q(self):
         self.assertRaises(ValueError, self.engine.search, 'companies')
 
+    def test_match(self):
+        match = self.engine.match('jurisdictions', q='U.K.')
+        self.assertEqual(match.response.status_code, 200)
+
+    def test_match_with_invalid_match_type(self):
+        self.assertRaises(NotImplementedError, self.engine.match, 'companies',
+                          q='Kellog')
+        self.assertRaises(ValueError, self.engine.match, 'jurisdictions')
+
     def test_fetch(self):
         fetch = self.engine.fetch('companies', 'gb', '00102498')
         self.assertEqual(fetch.results['name'], "BP P.L.C.")
@@ -40,4 +49,11 @@ class TestEngineV04(BaseTestCase):
     def test_fetch_with_bad_identifier(self):
         bad_fetch = self.engine.fetch('companies', 'gb', '1')
         self.assertEqual(bad_fetch.response.status_code, 404)
-        self.assertEqual(bad_fetch.results, None)
\ No newline at end of file
+        self.assertEqual(bad_fetch.results, None)
+
+    def test_fetch_many(self):
+        fetches = list(self.engine.fetch_many('companies',
+                                              [('gb', '00102498'),
+                                               ('gb', '1')]))
+        self.assertEqual(fetches[0].results['name'], "BP P.L.C.")
+        self.assertEqual(fetches[1].results, None)
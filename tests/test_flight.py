@@ -0,0 +1,73 @@
+from unittest import main
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import threading
+import time
+
+from opyncorporates.flight import SingleFlight, canonical_url
+from tests.base import BaseTestCase
+
+
+class TestSingleFlight(BaseTestCase):
+
+    def setUp(self):
+        super(TestSingleFlight, self).setUp()
+        self.flights = SingleFlight()
+        self.calls = []
+        self.started = threading.Event()
+
+    def tearDown(self):
+        super(TestSingleFlight, self).tearDown()
+        self.flights = None
+
+    def call(self, value):
+        self.calls.append(value)
+        self.started.set()
+        time.sleep(0.2)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_concurrently(self, value, count=5):
+        pool = ThreadPoolExecutor(max_workers=count)
+        leader = pool.submit(self.flights.do, 'key', self.call, value)
+        self.started.wait()
+        followers = [pool.submit(self.flights.do, 'key', self.call, value)
+                     for _ in range(count - 1)]
+        pool.shutdown(wait=True)
+        return leader, followers
+
+    def test_canonical_url(self):
+        self.assertEqual(canonical_url('/companies/search?q=bp&api_token=x'
+                                       '&per_page=100'),
+                         '/companies/search?per_page=100&q=bp')
+        self.assertEqual(canonical_url('/companies/gb/1?api_token=x'),
+                         '/companies/gb/1')
+
+    def test_coalesced_calls(self):
+        leader, followers = self.run_concurrently('ok')
+        self.assertEqual(leader.result(), ('ok', False))
+        for follower in followers:
+            self.assertEqual(follower.result(), ('ok', True))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(self.flights), 0)
+
+    def test_coalesced_errors(self):
+        leader, followers = self.run_concurrently(KeyError('missing'))
+        self.assertRaises(KeyError, leader.result)
+        for follower in followers:
+            self.assertRaises(KeyError, follower.result)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.flights.do('key', len, 'abc'), (3, False))
+
+    def test_timeout(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        leader = pool.submit(self.flights.do, 'key', self.call, 'ok')
+        self.started.wait()
+        self.assertRaises(TimeoutError, self.flights.do, 'key', self.call,
+                          'ok', timeout=0.01)
+        self.assertEqual(leader.result(), ('ok', False))
+        pool.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from unittest import main
+
+from opyncorporates import create_engine
+from opyncorporates.graph import Edge, Node, neighbours, node_key, parse_key
+from tests.base import BaseTestCase
+
+
+class TestGraphHelpers(BaseTestCase):
+
+    def setUp(self):
+        super(TestGraphHelpers, self).setUp()
+        self.company = {
+            'name': 'BP P.L.C.',
+            'jurisdiction_code': 'gb',
+            'company_number': '00102498',
+            'officers': [{'officer': {'id': 1, 'name': 'A'}},
+                         {'officer': {'id': 2, 'name': 'B'}}],
+            'filings': [{'filing': {'id': 3}}],
+            'corporate_groupings': [{'corporate_grouping': {'name': 'bp'}}],
+        }
+
+    def tearDown(self):
+        super(TestGraphHelpers, self).tearDown()
+        self.company = None
+
+    def test_node_key(self):
+        self.assertEqual(node_key('companies', 'gb', '00102498'),
+                         'companies/gb/00102498')
+        self.assertEqual(node_key('corporate_groupings', 'royal dutch'),
+                         'corporate_groupings/royal%20dutch')
+
+    def test_parse_key(self):
+        self.assertEqual(parse_key('/v0.4/companies/gb/00102498'),
+                         ('companies', ['gb', '00102498']))
+        self.assertEqual(parse_key('corporate_groupings/royal%20dutch'),
+                         ('corporate_groupings', ['royal dutch']))
+
+    def test_company_neighbours(self):
+        found = list(neighbours('companies/gb/00102498', self.company,
+                                ['officers', 'corporate_groupings']))
+        self.assertEqual(found, [('officers/1', 'officers'),
+                                 ('officers/2', 'officers'),
+                                 ('corporate_groupings/bp',
+                                  'corporate_groupings')])
+
+    def test_officer_neighbours(self):
+        officer = {'id': 1, 'company': {'jurisdiction_code': 'gb',
+                                        'company_number': '00102498'}}
+        found = list(neighbours('officers/1', officer))
+        self.assertEqual(found, [('companies/gb/00102498', 'officers')])
+        self.assertEqual(list(neighbours('officers/1', officer, ['filings'])),
+                         [])
+
+
+class TestCrawler(BaseTestCase):
+
+    def setUp(self):
+        super(TestCrawler, self).setUp()
+        self.engine = create_engine(api_version=self.api_version,
+                                    api_token=self.api_token)
+
+    def tearDown(self):
+        super(TestCrawler, self).tearDown()
+        self.engine = None
+
+    def test_crawl(self):
+        crawl = self.engine.crawl(['companies/gb/00102498'],
+                                  edge_types=['officers'], max_depth=1,
+                                  max_nodes=5)
+        items = list(crawl)
+        nodes = [i for i in items if isinstance(i, Node)]
+        edges = [i for i in items if isinstance(i, Edge)]
+        self.assertEqual(nodes[0].key, 'companies/gb/00102498')
+        self.assertTrue(len(nodes) <= 5)
+        self.assertEqual(len(set(n.key for n in nodes)), len(nodes))
+        for edge in edges:
+            self.assertEqual(edge.edge_type, 'officers')
+
+    def test_crawl_skips_failed_fetches(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token,
+                               timeout=(0.001, 0.001))
+        crawl = engine.crawl(['companies/gb/00102498'])
+        self.assertEqual(list(crawl), [])
+
+    def test_crawl_with_invalid_edge_type(self):
+        self.assertRaises(ValueError, self.engine.crawl,
+                          ['companies/gb/00102498'], edge_types=['test'])
+
+
+if __name__ == '__main__':
+    main()
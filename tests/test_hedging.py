@@ -0,0 +1,78 @@
+from unittest import main
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.hedging import Hedger, LatencyTracker
+from tests.base import BaseTestCase, Session
+
+
+class TestLatencyTracker(BaseTestCase):
+
+    def test_percentile(self):
+        tracker = LatencyTracker(window=100)
+        self.assertEqual(tracker.percentile(95), None)
+        for n in range(1, 101):
+            tracker.add(n)
+        self.assertEqual(tracker.percentile(50), 51)
+        self.assertEqual(tracker.percentile(95), 95)
+        tracker.add(1000)
+        self.assertEqual(len(tracker), 100)
+
+
+class TestHedger(BaseTestCase):
+
+    def test_hedged_call(self):
+        hedger = Hedger(percentile=50, budget=1, min_samples=1)
+        delays = [0.5, 0.0]
+        hedger.latencies.add(0.01)
+
+        def call():
+            time.sleep(delays.pop(0))
+            return 'ok'
+
+        start = time.time()
+        self.assertEqual(hedger.call(call), 'ok')
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(hedger.hedged, 1)
+
+    def test_hedge_function(self):
+        hedger = Hedger(percentile=50, budget=1, min_samples=1)
+        hedger.latencies.add(0.01)
+        result = hedger.call(time.sleep, 0.5, hedge=lambda seconds: 'hedge')
+        self.assertEqual(result, 'hedge')
+        self.assertEqual(len(hedger.latencies), 1)
+
+    def test_budget(self):
+        hedger = Hedger(percentile=50, budget=0, min_samples=1)
+        hedger.latencies.add(0.0)
+        self.assertEqual(hedger.call(time.sleep, 0.05), None)
+        self.assertEqual(hedger.hedged, 0)
+
+    def test_failed_call(self):
+        hedger = Hedger(percentile=50, budget=1, min_samples=1)
+        hedger.latencies.add(0.0)
+        self.assertRaises(ZeroDivisionError, hedger.call, lambda: 1 / 0)
+
+
+class TestEngineHedging(BaseTestCase):
+
+    def test_config(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token,
+                               timeout=(1, 10), hedge=True)
+        self.assertEqual(engine.timeout, (1, 10))
+        self.assertTrue(isinstance(engine.hedger, Hedger))
+
+    def test_token_wait_not_timed(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token,
+                               rate_limit=5, hedge=True)
+        engine.session = Session(status_code=404, delay=0.01)
+        for n in range(3):
+            engine.fetch('companies', 'gb', str(n))
+        self.assertEqual(len(engine.hedger.latencies), 3)
+        self.assertTrue(engine.hedger.latencies.percentile(100) < 0.15)
+
+
+if __name__ == '__main__':
+    main()
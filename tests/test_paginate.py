@@ -0,0 +1,60 @@
+from unittest import main
+
+from opyncorporates import create_engine
+from opyncorporates.api import build_response
+from opyncorporates.paginate import find_page, with_page
+from tests.base import BaseTestCase, Session
+
+
+class TestPaginate(BaseTestCase):
+
+    def test_with_page(self):
+        self.assertEqual(with_page('/companies/gb/1/filings?', 2),
+                         '/companies/gb/1/filings?page=2')
+        self.assertEqual(with_page('/filings?page=1&per_page=100', 3),
+                         '/filings?per_page=100&page=3')
+
+    def test_find_page(self):
+        data = {'results': {'company_filings': {
+            'filings': [{'filing': {'id': 1}}], 'page': 1, 'per_page': '30',
+            'total_pages': 4, 'total_count': 97}}}
+        path, key, meta = find_page(data)
+        self.assertEqual(path, ('results', 'company_filings'))
+        self.assertEqual(key, 'filings')
+        self.assertEqual(meta, {'page': 1, 'per_page': 30, 'total_pages': 4,
+                                'total_count': 97})
+        self.assertEqual(find_page({'results': {'company': {
+            'name': 'BP P.L.C.', 'filings': []}}}), None)
+
+    def test_paginate_without_total_count(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token)
+        engine.session = Session(respond=filings_page)
+        paginator = engine.paginate('v%s' % self.api_version, 'companies',
+                                    'gb', '1', 'filings')
+        self.assertEqual(paginator.total_count, None)
+        self.assertRaises(TypeError, len, paginator)
+        self.assertEqual([f['id'] for f in paginator], [1, 2, 3])
+        self.assertTrue(paginator.request.engine is engine)
+
+    def test_paginate_filings(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token)
+        paginator = engine.paginate('v%s' % self.api_version, 'companies',
+                                    'gb', '00102498', 'filings', per_page=10)
+        filings = list(paginator)
+        self.assertEqual(len(filings), len(paginator))
+        self.assertEqual(len(set(f['id'] for f in filings)), len(filings))
+
+
+def filings_page(url):
+    """ Returns the page of url in a collection of three one-filing pages."""
+
+    page = int(url.split('page=')[1]) if 'page=' in url else 1
+    return build_response(data={'results': {
+        'filings': [{'filing': {'id': page}}], 'page': page,
+        'total_pages': 3}})
+
+
+if __name__ == '__main__':
+    main()
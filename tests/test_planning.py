@@ -0,0 +1,58 @@
+from unittest import main
+
+from opyncorporates import create_engine
+from opyncorporates.planning import Estimate, Plan
+from tests.base import BaseTestCase
+
+
+class TestPlan(BaseTestCase):
+
+    def test_within_quota(self):
+        estimates = [Estimate({}, 95, 4, 5, 0), Estimate({}, 10, 0, 8, 2)]
+        plan = Plan(estimates, 1, 1.0, 20)
+        self.assertEqual(plan.calls, 13)
+        self.assertEqual(plan.pages, 4)
+        self.assertEqual(plan.cached, 2)
+        self.assertTrue(plan.within_quota)
+        self.assertRaises(RuntimeError, plan.raise_for_quota, max_calls=10)
+
+    def test_over_quota(self):
+        plan = Plan([Estimate({}, 95, 4, 5, 0)], 1, 1.0, 4)
+        self.assertFalse(plan.within_quota)
+        self.assertRaises(RuntimeError, plan.raise_for_quota)
+
+
+class TestPlanner(BaseTestCase):
+
+    def setUp(self):
+        super(TestPlanner, self).setUp()
+        self.engine = create_engine(api_version=self.api_version,
+                                    api_token=self.api_token)
+
+    def tearDown(self):
+        super(TestPlanner, self).tearDown()
+        self.engine = None
+
+    def test_plan_search(self):
+        planner = self.engine.planner()
+        planner.add_searches('companies', ['Kellog', 'kellog'], per_page=100)
+        plan = planner.plan()
+        search = self.engine.search('companies', q='Kellog', per_page=100)
+        self.assertEqual(plan.probes, 1)
+        self.assertEqual(plan.estimates[0].pages, search.total_pages)
+        self.assertEqual(plan.calls, 2 * max(search.total_pages, 1))
+
+    def test_plan_fetch_many(self):
+        planner = self.engine.planner()
+        planner.add_fetch_many('companies', [('gb', '00102498')])
+        plan = planner.plan(check_quota=False)
+        self.assertEqual(plan.probes, 0)
+        self.assertEqual(plan.calls, 1)
+
+    def test_plan_search_with_missing_q(self):
+        self.assertRaises(ValueError, self.engine.planner().add_search,
+                          'companies')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+from unittest import main
+
+import requests
+
+from opyncorporates import create_engine
+from opyncorporates.reconcile import Reconciler, normalize_name, score
+from tests.base import BaseTestCase
+
+
+class TestReconcile(BaseTestCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('The Acme Widget Co., Ltd.'),
+                         'acme widget')
+        self.assertEqual(normalize_name('Acme & Sons GmbH'), 'acme and sons')
+        self.assertEqual(normalize_name(u'Soci\xe9t\xe9 G\xe9n\xe9rale S.A.'),
+                         'societe generale')
+        self.assertEqual(normalize_name('Company Ltd'), 'company')
+        self.assertEqual(normalize_name(None), '')
+
+    def test_score(self):
+        self.assertEqual(score('acme widget', {'name': 'ACME WIDGET LTD'}), 1)
+        self.assertLess(score('acme widget', {'name': 'ACME GADGET LTD'}), 1)
+        self.assertEqual(score('acme', {'name': 'NEW CO LTD',
+                                        'previous_names': [
+                                            {'company_name': 'Acme Ltd'}]}),
+                         1)
+        self.assertEqual(score('acme', {'name': None}), 0)
+
+    def test_query_cache(self):
+        names = ['A Ltd', 'B Ltd', 'C Ltd', 'A Limited', 'C plc']
+        reconciler = Counter(None, max_workers=2, cache_size=2)
+        results = list(reconciler.reconcile(names))
+        self.assertEqual([r[0] for r in results], names)
+        self.assertEqual(results[3][1], {'name': 'a'})
+        self.assertEqual(sorted(reconciler.queries), ['a', 'a', 'b', 'c'])
+
+    def test_failed_search(self):
+        names = ['A Ltd', 'B Ltd']
+        reconciler = Reconciler(Engine(), max_workers=2)
+        results = list(reconciler.reconcile(names))
+        self.assertEqual(results, [('A Ltd', None, 0.0), ('B Ltd', None, 0.0)])
+        self.assertEqual(reconciler.errors, 2)
+
+    def test_reconcile(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token)
+        names = ['BP p.l.c.', 'B.P. PLC', '']
+        results = list(engine.reconcile(names, 'gb'))
+        self.assertEqual([r[0] for r in results], names)
+        self.assertEqual(results[0][1]['company_number'], '00102498')
+        self.assertEqual(results[1][1], results[0][1])
+        self.assertEqual(results[2][1:], (None, 0.0))
+
+
+class Counter(Reconciler):
+    """ A Reconciler that records its queries instead of searching."""
+
+    def __init__(self, *args, **kwargs):
+        super(Counter, self).__init__(*args, **kwargs)
+        self.queries = []
+
+    def match(self, query):
+        self.queries.append(query)
+        return {'name': query}, 1.0
+
+
+class Engine(object):
+    """ An engine whose searches time out."""
+
+    max_workers = 2
+
+    def search(self, object_type, **kwargs):
+        raise requests.Timeout('Read timed out.')
+
+
+if __name__ == '__main__':
+    main()
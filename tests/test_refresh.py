@@ -0,0 +1,65 @@
+from unittest import main
+import threading
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.refresh import Refresher
+from opyncorporates.scheduling import current
+from opyncorporates.store import EntityStore
+from tests.base import BaseTestCase
+
+
+class TestRefresher(BaseTestCase):
+
+    def setUp(self):
+        super(TestRefresher, self).setUp()
+        self.refresher = Refresher(soft_ttl=60, min_hits=2, max_workers=1)
+        self.refreshed = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        super(TestRefresher, self).tearDown()
+        self.refresher.close()
+
+    def refresh(self, key):
+        self.refreshed.append((key, current()))
+        self.done.set()
+
+    def test_refresh_hot_stale(self):
+        stale = time.time() - 120
+        self.assertFalse(self.refresher.access('a', stale, self.refresh))
+        self.assertTrue(self.refresher.access('a', stale, self.refresh))
+        self.done.wait(1)
+        self.refresher.close()
+        self.assertEqual(self.refreshed, [('a', ('background', 'refresh'))])
+        self.assertEqual(self.refresher.refreshed, 1)
+
+    def test_skip_fresh_and_missing(self):
+        for _ in range(3):
+            self.refresher.access('a', time.time(), self.refresh)
+            self.refresher.access('b', None, self.refresh)
+        self.refresher.close()
+        self.assertEqual(self.refreshed, [])
+        self.assertEqual(self.refresher.hits('b'), 3)
+
+    def test_decay(self):
+        refresher = Refresher(soft_ttl=60, max_keys=2)
+        for key in ['a', 'a', 'a', 'a', 'b', 'c']:
+            refresher.access(key, None, self.refresh)
+        self.assertEqual(refresher.hits('a'), 2)
+        self.assertEqual(refresher.hits('b'), 0)
+        refresher.close()
+
+    def test_limit(self):
+        self.refresher.limit(10)
+        self.assertEqual(self.refresher.limiter.rate, 1)
+        self.assertRaises(ValueError, Refresher, 60, share=0)
+
+    def test_engine_requires_store(self):
+        self.assertRaises(ValueError, create_engine, refresh=60)
+        engine = create_engine(store=EntityStore(), refresh=60, rate_limit=5)
+        self.assertEqual(engine.refresher.limiter.rate, 0.5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+from unittest import main
+import threading
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.hedging import Hedger
+from opyncorporates.scheduling import Scheduler, bind, current, priority
+from tests.base import BaseTestCase, Session
+
+
+class TestScheduler(BaseTestCase):
+
+    def setUp(self):
+        super(TestScheduler, self).setUp()
+        self.order = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        super(TestScheduler, self).tearDown()
+        self.order = None
+
+    def hold(self, scheduler, started):
+        with scheduler.slot('background', 'holder'):
+            started.set()
+            self.release.wait()
+
+    def request(self, scheduler, name, job):
+        with scheduler.slot(name, job):
+            self.order.append((name, job))
+
+    def run_queued(self, scheduler, requests):
+        """ Queues requests behind a held slot and releases them."""
+        started = threading.Event()
+        holder = threading.Thread(target=self.hold, args=(scheduler, started))
+        holder.start()
+        started.wait()
+        threads = []
+        for name, job in requests:
+            thread = threading.Thread(target=self.request,
+                                      args=(scheduler, name, job))
+            thread.start()
+            threads.append(thread)
+            while scheduler.waiting < len(threads):
+                time.sleep(0.001)
+        self.release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+    def test_priority_order(self):
+        scheduler = Scheduler(max_concurrent=1, caps={})
+        self.run_queued(scheduler, [('bulk', 'a'), ('background', 'b'),
+                                    ('interactive', 'c')])
+        self.assertEqual([n for n, j in self.order],
+                         ['interactive', 'bulk', 'background'])
+
+    def test_fair_queuing(self):
+        scheduler = Scheduler(max_concurrent=1, caps={})
+        scheduler.set_weight('b', 2)
+        self.run_queued(scheduler, [('bulk', 'a')] * 4 + [('bulk', 'b')] * 4)
+        jobs = ''.join(j for n, j in self.order)
+        self.assertEqual(jobs[:6], 'babbab')
+
+    def test_caps(self):
+        scheduler = Scheduler(max_concurrent=4, caps={'bulk': 1})
+        with scheduler.slot('bulk'):
+            self.assertEqual(scheduler.running['bulk'], 1)
+            with scheduler.slot('interactive'):
+                self.assertEqual(scheduler.running['interactive'], 1)
+        self.assertEqual(scheduler.running, {'interactive': 0, 'bulk': 0,
+                                             'background': 0})
+
+    def test_invalid_priority(self):
+        scheduler = Scheduler()
+        self.assertRaises(ValueError, scheduler.set_weight, 'a', 0)
+        with self.assertRaises(ValueError):
+            with scheduler.slot('urgent'):
+                pass
+
+    def test_bind(self):
+        with priority('bulk', job='crawl'):
+            fn = bind(current)
+        self.assertEqual(current(), None)
+        self.assertEqual(fn(), ('bulk', 'crawl'))
+        self.assertEqual(bind(current, default='bulk')()[0], 'bulk')
+
+
+class TestEngineScheduler(BaseTestCase):
+
+    def test_scheduled_fetch(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token, scheduler=True)
+        with engine.priority('interactive', job='lookup'):
+            fetch = engine.fetch('companies', 'gb', '00102498')
+        self.assertEqual(fetch.results['name'], "BP P.L.C.")
+        self.assertEqual(engine.scheduler.waiting, 0)
+
+    def test_interactive_ahead_of_hedged_bulk(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token,
+                               scheduler=Scheduler(max_concurrent=1),
+                               hedge=Hedger(max_workers=2))
+        engine.session = Session(status_code=404, delay=0.05)
+
+        def fetch(number, name):
+            with engine.priority(name):
+                engine.fetch('companies', 'gb', number)
+
+        threads = [threading.Thread(target=fetch, args=(str(n), 'bulk'))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        fetch('interactive', 'interactive')
+        for thread in threads:
+            thread.join()
+        numbers = [url.split('?')[0].rsplit('/', 1)[1]
+                   for url in engine.session.calls]
+        self.assertEqual(numbers[:2], ['0', 'interactive'])
+
+    def test_flights_per_priority(self):
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token, scheduler=True)
+        url = 'https://api.opencorporates.com/v0.4/companies/gb/1'
+        with engine.priority('bulk'):
+            bulk = engine._flight_key(url)
+        self.assertNotEqual(bulk, engine._flight_key(url))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+from unittest import main
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.store import EntityStore, entity_key, normalize
+from tests.base import BaseTestCase
+
+
+class TestEntityStore(BaseTestCase):
+
+    def setUp(self):
+        super(TestEntityStore, self).setUp()
+        self.store = EntityStore(max_age=60)
+        self.store.put('companies/gb/00102498', {'company': {
+            'name': 'BP P.L.C.', 'jurisdiction_code': 'gb',
+            'company_number': '00102498'}})
+        self.store.put('officers/1', {'officer': {
+            'id': 1, 'name': 'Jane Doe', 'company': {
+                'jurisdiction_code': 'gb', 'company_number': '00102498'}}})
+
+    def tearDown(self):
+        super(TestEntityStore, self).tearDown()
+        self.store.close()
+        self.store = None
+
+    def test_normalize(self):
+        self.assertEqual(normalize('BP  P.L.C.'), 'bp plc')
+        self.assertEqual(normalize(u'Soci\xe9t\xe9 G\xe9n\xe9rale, S.A.'),
+                         'societe generale sa')
+
+    def test_entity_key(self):
+        url = 'https://api.opencorporates.com/v0.4/companies/gb/00102498'
+        self.assertEqual(entity_key(url), 'companies/gb/00102498')
+        self.assertEqual(entity_key(url + '?api_token=x'),
+                         'companies/gb/00102498')
+        self.assertEqual(entity_key(url + '?sparse=true'), None)
+        self.assertEqual(entity_key(url + '/filings'), None)
+
+    def test_get(self):
+        self.assertEqual(len(self.store), 2)
+        self.assertTrue('companies/gb/00102498' in self.store)
+        self.assertEqual(self.store.get('companies/gb/00102498')['name'],
+                         'BP P.L.C.')
+        self.assertEqual(self.store.get('companies/gb/1'), None)
+
+    def test_fresh(self):
+        self.assertTrue(self.store.fresh('companies/gb/00102498'))
+        self.store.put('companies/gb/1', {'company': {'name': 'OLD'}},
+                       fetched_at=time.time() - 120)
+        self.assertFalse(self.store.fresh('companies/gb/1'))
+        self.assertTrue(self.store.fresh('companies/gb/1', max_age=300))
+
+    def test_find(self):
+        companies = self.store.find_companies(name='bp p', jurisdiction_code='gb')
+        self.assertEqual([c['name'] for c in companies], ['BP P.L.C.'])
+        self.assertEqual(self.store.find_companies(name='shell'), [])
+        officers = self.store.find_officers(company_number='00102498')
+        self.assertEqual([o['name'] for o in officers], ['Jane Doe'])
+
+
+class TestEngineStore(BaseTestCase):
+
+    def test_fetch_from_store(self):
+        store = EntityStore()
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token, store=store)
+        store.put('companies/gb/00102498', {'company': {'name': 'BP P.L.C.'}})
+        self.assertTrue(engine.cached('companies', 'gb', '00102498'))
+        fetch = engine.fetch('companies', 'gb', '00102498')
+        self.assertEqual(fetch.results['name'], 'BP P.L.C.')
+        self.assertTrue(fetch.response.from_store)
+
+
+if __name__ == '__main__':
+    main()
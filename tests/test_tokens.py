@@ -0,0 +1,107 @@
+from unittest import main
+import time
+
+from opyncorporates import create_engine
+from opyncorporates.api import build_response
+from opyncorporates.tokens import RateLimiter, TokenPool, with_token
+from tests.base import BaseTestCase, Session
+
+
+class TestTokenPool(BaseTestCase):
+
+    def setUp(self):
+        super(TestTokenPool, self).setUp()
+        self.pool = TokenPool(['a', 'b'])
+
+    def tearDown(self):
+        super(TestTokenPool, self).tearDown()
+        self.pool = None
+
+    def test_with_token(self):
+        url = 'https://api.opencorporates.com/v0.4/companies/gb/1'
+        self.assertEqual(with_token(url, 'a'), url + '?api_token=a')
+        self.assertEqual(with_token(url + '?api_token=b&x=1', 'a'),
+                         url + '?x=1&api_token=a')
+        self.assertEqual(with_token(url + '?api_token=b', None), url)
+
+    def test_acquire_by_capacity(self):
+        self.pool.update('a', {'calls_remaining': {'today': 10,
+                                                   'this_month': 100}})
+        self.pool.update('b', {'calls_remaining': {'today': 20,
+                                                   'this_month': 15}})
+        self.assertEqual(self.pool.remaining, 25)
+        self.assertEqual(self.pool.acquire(), 'b')
+        self.pool.release('b')
+        self.assertEqual(self.pool.tokens['b'].remaining, 14)
+
+    def test_throttled_token(self):
+        token = self.pool.acquire()
+        retry = self.pool.release(token, build_response(
+            429, headers={'Retry-After': '60'}))
+        self.assertTrue(retry)
+        other = [t for t in ['a', 'b'] if t != token][0]
+        self.assertEqual(self.pool.acquire(), other)
+
+    def test_exhausted_pool(self):
+        for token in ['a', 'b']:
+            self.pool.release(token, build_response(
+                headers={'X-RateLimit-Remaining': '0'}))
+        self.assertRaises(RuntimeError, self.pool.acquire)
+
+    def test_exhausted_token_reset(self):
+        for token in ['a', 'b']:
+            self.pool.release(token, build_response(
+                403, headers={'X-RateLimit-Reset': '0.05'},
+                text='Rate limit exceeded'))
+        self.assertRaises(RuntimeError, self.pool.acquire)
+        time.sleep(0.06)
+        token = self.pool.acquire()
+        self.assertTrue(self.pool.recheck(token))
+        self.assertFalse(self.pool.recheck(token))
+
+    def test_single_token_pool(self):
+        pool = TokenPool([None])
+        pool.release(None, build_response(
+            headers={'X-RateLimit-Remaining': '0'}))
+        self.assertTrue(pool.tokens[None].exhausted)
+        self.assertEqual(pool.acquire(), None)
+
+    def test_capacity(self):
+        self.pool.update('a', {'calls_remaining': {'today': 10}})
+        self.pool.update('b', {'calls_remaining': {'today': 5}})
+        self.assertEqual(self.pool.acquire(), 'a')
+        self.assertEqual(self.pool.tokens['a'].capacity, 9)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(10)
+        self.assertTrue(limiter.consume())
+        self.assertFalse(limiter.consume())
+        self.assertTrue(0 < limiter.delay() <= 0.1)
+
+
+class TestEngineTokens(BaseTestCase):
+
+    def test_token_pool(self):
+        engine = create_engine(api_token=self.api_token,
+                               api_tokens=['a', 'b'])
+        self.assertEqual(len(engine.tokens), 3 if self.api_token else 2)
+
+    def test_exhausted_engine_token(self):
+        engine = create_engine(api_version=self.api_version)
+        engine.session = Session(data={'results': {'company': {}}},
+                                 headers={'X-RateLimit-Remaining': '0'})
+        for _ in range(2):
+            fetch = engine.fetch('companies', 'gb', '1')
+            self.assertEqual(fetch.response.status_code, 200)
+        self.assertEqual(len(engine.session.calls), 2)
+
+    def test_refresh_quotas(self):
+        if self.api_token is None:
+            self.skipTest('OC_API_TOKEN is not set.')
+        engine = create_engine(api_version=self.api_version,
+                               api_token=self.api_token)
+        self.assertTrue(engine.refresh_quotas() >= 0)
+
+
+if __name__ == '__main__':
+    main()